@@ -0,0 +1,240 @@
+"""
+Бенчмарки команд оболочки на синтетических деревьях на реальном диске: много мелких файлов,
+несколько больших файлов, глубокая вложенность и несжимаемые данные.
+Результаты выводятся в JSON и могут сравниваться с сохраненной базовой линией.
+Запуск из корня репозитория:
+    python -m benchmarks.bench_commands --scale small --output baseline.json
+    python -m benchmarks.bench_commands --scale small --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_copy import make_file
+from src.commands import (cat_stream, cp, create_tar, create_zip, du, extract_tar, extract_zip, ls, ls_l, mv,
+                          rm)
+from src.search import find, grep
+
+MB = 1024 * 1024
+
+SCALES = {
+    "small": {"small_files": 2000, "huge_files": 2, "huge_mb": 32, "depth": 64, "random_files": 8, "random_mb": 4},
+    "medium": {"small_files": 20000, "huge_files": 2, "huge_mb": 256, "depth": 256, "random_files": 16,
+               "random_mb": 16},
+    "large": {"small_files": 200000, "huge_files": 4, "huge_mb": 1024, "depth": 1024, "random_files": 32,
+              "random_mb": 64},
+}
+"""Параметры наборов данных для каждого масштаба"""
+
+MIN_DELTA = 0.005
+"""Разница во времени, меньше которой замедление считается шумом, секунд"""
+
+WORDS = [b"alpha", b"beta", b"gamma", b"delta", b"error", b"warning", b"request", b"needle", b"shell"]
+
+
+def make_small_files(root, count, fanout=100):
+    """Много мелких текстовых файлов по fanout в директории"""
+    rng = random.Random(count)
+    for i in range(count):
+        directory = os.path.join(root, f"d{i // fanout:05d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{i:06d}.txt"), "wb") as file:
+            file.write(b" ".join(rng.choice(WORDS) for _ in range(rng.randint(100, 800))) + b"\n")
+
+def make_huge_files(root, count, size):
+    """Несколько больших сжимаемых файлов с текстом журнала"""
+    os.makedirs(root, exist_ok=True)
+    line = b" ".join(WORDS) + b"\n"
+    block = line * (MB // len(line))
+    for i in range(count):
+        with open(os.path.join(root, f"huge{i}.log"), "wb") as file:
+            for _ in range(size // len(block)):
+                file.write(block)
+
+def make_deep(root, depth):
+    """Цепочка вложенных директорий с файлом на каждом уровне"""
+    path = root
+    for level in range(depth):
+        path = os.path.join(path, f"l{level}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "file.txt"), "wb") as file:
+            file.write(WORDS[level % len(WORDS)] * 64)
+
+def make_incompressible(root, count, size):
+    """Файлы со случайным содержимым"""
+    os.makedirs(root, exist_ok=True)
+    for i in range(count):
+        make_file(os.path.join(root, f"random{i}.bin"), size)
+
+def make_datasets(base, scale):
+    """
+    Создание наборов данных
+    Returns:
+        dict: имя набора -> путь
+    """
+    params = SCALES[scale]
+    datasets = {
+        "small_files": (make_small_files, (params["small_files"],)),
+        "huge_files": (make_huge_files, (params["huge_files"], params["huge_mb"] * MB)),
+        "deep": (make_deep, (params["depth"],)),
+        "incompressible": (make_incompressible, (params["random_files"], params["random_mb"] * MB)),
+    }
+    paths = {}
+    for name, (make, args) in datasets.items():
+        paths[name] = os.path.join(base, name)
+        make(paths[name], *args)
+    return paths
+
+def tree_size(path):
+    """Количество файлов и суммарный размер дерева"""
+    files = size = 0
+    for root, _, filenames in os.walk(path):
+        files += len(filenames)
+        size += sum(os.path.getsize(os.path.join(root, name)) for name in filenames)
+    return files, size
+
+def cat_tree(path):
+    """cat_stream каждого файла дерева в /dev/null"""
+    with open(os.devnull, "wb") as out:
+        for root, _, filenames in os.walk(path):
+            for name in filenames:
+                cat_stream(os.path.join(root, name), out)
+
+def make_cases(data, work):
+    """
+    Измеряемые операции над набором данных
+    Returns:
+        list: (имя, подготовка или None, операция); подготовка и операция - функции без аргументов
+    """
+    copy = os.path.join(work, "copy")
+    moved = os.path.join(work, "moved")
+    zip_path = os.path.join(work, "data.zip")
+    tar_path = os.path.join(work, "data.tar.gz")
+    extracted = os.path.join(work, "extracted")
+    make_copy = lambda: shutil.copytree(data, copy)
+    return [
+        ("ls", None, lambda: ls(data)),
+        ("ls_l", None, lambda: ls_l(data)),
+        ("cat", None, lambda: cat_tree(data)),
+        ("du", None, lambda: du(data)),
+        ("find", None, lambda: list(find(data))),
+        ("grep", None, lambda: list(grep("needle", [data], recursive=True, literal=True, count=True))),
+        ("cp", None, lambda: cp(data, copy, ["-r"])),
+        ("mv", make_copy, lambda: mv(copy, moved)),
+        ("rm", make_copy, lambda: rm(copy, ["-r", "-f"])),
+        ("create_zip", None, lambda: create_zip(data, zip_path)),
+        ("extract_zip", lambda: create_zip(data, zip_path), lambda: extract_zip(zip_path, extracted)),
+        ("create_tar", None, lambda: create_tar(data, tar_path)),
+        ("extract_tar", lambda: create_tar(data, tar_path), lambda: extract_tar(tar_path, extracted)),
+    ]
+
+def clean(work):
+    """Очистка рабочей директории между запусками"""
+    for name in os.listdir(work):
+        path = os.path.join(work, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+def measure(setup, operation, work, repeat):
+    """Время операции в каждом из repeat запусков, секунд; вывод команд подавляется"""
+    timings = []
+    for _ in range(repeat):
+        clean(work)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - start)
+    clean(work)
+    return timings
+
+def run(base, scale, repeat, only=None):
+    """
+    Запуск всех бенчмарков
+    Returns:
+        dict: Результаты: {"meta": ..., "results": {"набор/команда": {...}}}
+    """
+    results = {}
+    datasets = make_datasets(os.path.join(base, "data"), scale)
+    work = os.path.join(base, "work")
+    os.makedirs(work)
+    for dataset, data in datasets.items():
+        files, size = tree_size(data)
+        for command, setup, operation in make_cases(data, work):
+            name = f"{dataset}/{command}"
+            if only and not any(part in name for part in only):
+                continue
+            timings = measure(setup, operation, work, repeat)
+            results[name] = {"median": statistics.median(timings), "min": min(timings),
+                             "files": files, "bytes": size}
+            print(f"{name:32} {results[name]['median']:9.4f}s", file=sys.stderr)
+    meta = {"scale": scale, "repeat": repeat, "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+    return {"meta": meta, "results": results}
+
+def compare(current, baseline, threshold):
+    """
+    Сравнение с базовой линией по медианному времени
+    Args:
+        current: Текущие результаты
+        baseline: Сохраненные результаты
+        threshold: Допустимое относительное замедление, например 0.2 - на 20%
+    Returns:
+        list: Строки (имя, базовое время, текущее время, отношение, регрессия ли)
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        regressed = ratio > 1 + threshold and result["median"] - base["median"] > MIN_DELTA
+        rows.append((name, base["median"], result["median"], ratio, regressed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Shell commands benchmark suite")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="размер наборов данных")
+    parser.add_argument("--repeat", type=int, default=3, help="количество запусков каждой операции")
+    parser.add_argument("--dir", default=None, help="директория для тестовых данных (реальный диск)")
+    parser.add_argument("--only", action="append", help="запускать только бенчмарки, содержащие подстроку")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON")
+    parser.add_argument("--baseline", help="файл базовой линии для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление, доля")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=options.dir) as tmp:
+        current = run(tmp, options.scale, options.repeat, options.only)
+
+    text = json.dumps(current, indent=2)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = 0
+        for name, base, value, ratio, regressed in compare(current, baseline, options.threshold):
+            regressions += regressed
+            print(f"{'REGRESSION' if regressed else 'ok':10} {name:32} {base:9.4f}s -> {value:9.4f}s "
+                  f"({ratio:.2f}x)", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
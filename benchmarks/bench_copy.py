@@ -0,0 +1,62 @@
+"""
+Сравнение скорости копирования больших файлов: shutil.copy2 и src.transfer.copy_file.
+Запуск из корня репозитория:
+    python -m benchmarks.bench_copy --size-gb 2 --dir /mnt/data
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from src.transfer import copy_content, copy_file
+
+GB = 1024 ** 3
+
+
+def make_file(path, size):
+    """Создание файла заданного размера с несжимаемым содержимым"""
+    block = os.urandom(16 * 1024 * 1024)
+    with open(path, "wb") as file:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            file.write(chunk)
+            written += len(chunk)
+
+def measure(copy, src, dst, repeat):
+    """Лучшая скорость копирования из нескольких запусков, ГБ/с"""
+    best = 0.0
+    size = os.path.getsize(src)
+    for _ in range(repeat):
+        if os.path.exists(dst):
+            os.remove(dst)
+        start = time.perf_counter()
+        copy(src, dst)
+        elapsed = time.perf_counter() - start
+        best = max(best, size / GB / elapsed)
+    os.remove(dst)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy throughput benchmark")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="размер тестового файла, ГБ")
+    parser.add_argument("--repeat", type=int, default=3, help="количество запусков")
+    parser.add_argument("--dir", default=None, help="директория для тестовых файлов")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=options.dir) as tmp:
+        src = os.path.join(tmp, "source.bin")
+        dst = os.path.join(tmp, "target.bin")
+        make_file(src, int(options.size_gb * GB))
+
+        method = copy_content(src, dst)
+        os.remove(dst)
+
+        print(f"file size: {options.size_gb} GB")
+        print(f"shutil.copy2: {measure(shutil.copy2, src, dst, options.repeat):.2f} GB/s")
+        print(f"copy_file ({method}): {measure(copy_file, src, dst, options.repeat):.2f} GB/s")
+
+
+if __name__ == "__main__":
+    main()
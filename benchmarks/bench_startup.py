@@ -0,0 +1,44 @@
+"""
+Время холодного запуска оболочки и список тяжелых модулей, загруженных при старте.
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --repeat 20
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("zipfile", "tarfile", "shutil", "lzma", "bz2", "concurrent.futures", "src.archive_commands",
+                 "src.file_commands")
+
+PROBE = ("import sys, src.main; "
+         f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+
+
+def measure(code, repeat):
+    """Медианное время выполнения кода в новом интерпретаторе, мс, и его вывод"""
+    timings = []
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                                text=True).stdout.strip()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), output
+
+def main():
+    parser = argparse.ArgumentParser(description="Shell cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="количество запусков")
+    options = parser.parse_args()
+
+    bare_ms, _ = measure("pass", options.repeat)
+    shell_ms, loaded = measure(PROBE, options.repeat)
+
+    print(f"python startup: {bare_ms:.1f} ms")
+    print(f"shell startup: {shell_ms:.1f} ms (+{shell_ms - bare_ms:.1f} ms)")
+    print(f"heavy modules loaded at startup: {loaded or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
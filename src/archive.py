@@ -0,0 +1,616 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+
+from src.const import (CHUNK_SIZE, COPY_BUFFER_SIZE, MTIME_SETTLE_NS, SPOOL_MAX_SIZE, SPOOL_MEMORY_LIMIT,
+                       TAR_BLOCK_SIZE, TAR_INCREMENTAL_MEMBER)
+from src.stats import phase
+from src.transfer import default_jobs, run_parallel
+from src.vfs import member_name
+
+
+def iter_files(folder, skip=None):
+    """
+    Файлы директории в детерминированном порядке
+    Args:
+        folder: Исходная директория
+        skip: Путь, который нужно пропустить (например, создаваемый архив)
+    Returns:
+        list: Пары (путь к файлу, имя в архиве)
+    """
+    skip = os.path.abspath(skip) if skip is not None else None
+    result = []
+    for root, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(root, name)
+            if skip is not None and os.path.abspath(path) == skip:
+                continue
+            result.append((path, os.path.relpath(path, folder).replace(os.sep, "/")))
+    return result
+
+def spool_size(jobs):
+    """
+    Размер буфера в памяти для одного сжатого элемента zip
+    В очереди записи находится до 2 * jobs элементов, поэтому при большом числе
+    потоков порог сброса во временный файл уменьшается, чтобы их суммарный объем
+    не превышал SPOOL_MEMORY_LIMIT.
+    Args:
+        jobs: Количество потоков сжатия
+    Returns:
+        int: Порог сброса буфера во временный файл, байт
+    """
+    return min(SPOOL_MAX_SIZE, SPOOL_MEMORY_LIMIT // (2 * jobs))
+
+def _compress_member(path, level, max_size=SPOOL_MAX_SIZE):
+    """
+    Сжатие файла в raw deflate во временный буфер
+    Args:
+        path: Путь к файлу
+        level: Уровень сжатия, 0 - без сжатия
+        max_size: Размер данных, после которого буфер сбрасывается во временный файл
+    Returns:
+        tuple: (буфер с данными, CRC32, исходный размер, сжатый размер)
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS) if level else None
+    crc = 0
+    size = 0
+    with phase("compress"), open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            spool.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            spool.write(compressor.flush())
+    compress_size = spool.tell()
+    spool.seek(0)
+    return spool, crc, size, compress_size
+
+def _write_member(zip_file, zinfo, data, size=None):
+    """
+    Запись заранее сжатого элемента в архив без повторного сжатия
+    Args:
+        zip_file: Архив, открытый на запись
+        zinfo: Описание элемента с заполненными CRC и размерами
+        data: Поток сжатых данных
+        size: Сколько байт читать из потока; None - до конца
+    """
+    zinfo.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zinfo.FileHeader())
+    if size is None:
+        shutil.copyfileobj(data, zip_file.fp, COPY_BUFFER_SIZE)
+    else:
+        while size > 0:
+            chunk = data.read(min(size, COPY_BUFFER_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {zinfo.filename}")
+            zip_file.fp.write(chunk)
+            size -= len(chunk)
+    zip_file.filelist.append(zinfo)
+    zip_file.NameToInfo[zinfo.filename] = zinfo
+    zip_file.start_dir = zip_file.fp.tell()
+
+def write_zip(folder, archive, jobs=None, level=zlib.Z_DEFAULT_COMPRESSION):
+    """
+    Создание zip архива с параллельным сжатием элементов
+    Элементы сжимаются в пуле потоков (zlib освобождает GIL) и записываются
+    в архив в порядке сортировки путей.
+    Args:
+        folder: Исходная директория
+        archive: Путь к создаваемому архиву
+        jobs: Количество потоков сжатия
+        level: Уровень сжатия 0-9, 0 - без сжатия
+    Yields:
+        str: Имя добавленного элемента
+    """
+    files = iter_files(folder, skip=archive)
+    jobs = jobs or default_jobs()
+    compress_type = zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED
+
+    max_size = spool_size(jobs)
+
+    with zipfile.ZipFile(archive, "w") as zip_file, ThreadPoolExecutor(jobs) as pool:
+        pending = deque()
+        for path, arcname in files:
+            pending.append((path, arcname, pool.submit(_compress_member, path, level, max_size)))
+            if len(pending) < jobs * 2:
+                continue
+            yield _flush_member(zip_file, pending.popleft(), compress_type)
+        while pending:
+            yield _flush_member(zip_file, pending.popleft(), compress_type)
+
+def _flush_member(zip_file, item, compress_type):
+    """Запись готового элемента из очереди сжатия"""
+    path, arcname, future = item
+    data, crc, size, compress_size = future.result()
+    with data:
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        zinfo.compress_type = compress_type
+        zinfo.CRC = crc
+        zinfo.file_size = size
+        zinfo.compress_size = compress_size
+        _write_member(zip_file, zinfo, data)
+    return arcname
+
+def _dos_time(date_time):
+    """Время в точности заголовка zip (секунды округляются вниз до четных)"""
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+def _file_crc(path):
+    """CRC32 содержимого файла"""
+    crc = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+def _update_member(path, old, level, checksum, max_size=SPOOL_MAX_SIZE):
+    """
+    Сравнение файла с элементом существующего архива и сжатие только измененного файла
+    Args:
+        path: Путь к файлу
+        old: ZipInfo элемента старого архива или None
+        level: Уровень сжатия
+        checksum: Сравнивать размер и CRC32 вместо размера и времени изменения
+        max_size: Порог сброса буфера сжатых данных во временный файл
+    Returns:
+        tuple | None: Результат _compress_member или None, если элемент можно скопировать как есть
+    """
+    if old is not None and not old.flag_bits & 0x1 and old.file_size == os.path.getsize(path):
+        with phase("compare"):
+            if checksum:
+                unchanged = _file_crc(path) == old.CRC
+            else:
+                unchanged = _dos_time(zipfile.ZipInfo.from_file(path).date_time) == _dos_time(old.date_time)
+        if unchanged:
+            return None
+    return _compress_member(path, level, max_size)
+
+def _data_offset(source, zinfo):
+    """Смещение сжатых данных элемента по его локальному заголовку"""
+    source.seek(zinfo.header_offset)
+    header = source.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local header of {zinfo.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return zinfo.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+def update_zip(folder, archive, jobs=None, level=zlib.Z_DEFAULT_COMPRESSION, checksum=False):
+    """
+    Обновление zip архива: сжимаются только новые и измененные файлы
+    Центральный каталог существующего архива сравнивается с деревом; сжатые данные
+    неизмененных элементов копируются в новый архив байт в байт. Архив собирается
+    во временном файле и заменяет старый после успешной записи; элементы удаленных
+    файлов в него не попадают.
+    Args:
+        folder: Исходная директория
+        archive: Путь к архиву; если его нет, создается новый
+        jobs: Количество потоков сравнения и сжатия
+        level: Уровень сжатия новых элементов 0-9
+        checksum: Сравнивать размер и CRC32 вместо размера и времени изменения
+    Yields:
+        tuple: (имя элемента, был ли он сжат заново)
+    """
+    files = iter_files(folder, skip=archive)
+    jobs = jobs or default_jobs()
+    compress_type = zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED
+    old_file = zipfile.ZipFile(archive) if os.path.exists(archive) else None
+    old_members = {info.filename: info for info in old_file.infolist()} if old_file else {}
+    tmp = f"{archive}.part"
+    max_size = spool_size(jobs)
+
+    try:
+        with zipfile.ZipFile(tmp, "w") as zip_file, ThreadPoolExecutor(jobs) as pool:
+            pending = deque()
+            for path, arcname in files:
+                old = old_members.get(arcname)
+                future = pool.submit(_update_member, path, old, level, checksum, max_size)
+                pending.append((path, arcname, old, future))
+                if len(pending) < jobs * 2:
+                    continue
+                yield _flush_update(zip_file, old_file, pending.popleft(), compress_type)
+            while pending:
+                yield _flush_update(zip_file, old_file, pending.popleft(), compress_type)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        if old_file:
+            old_file.close()
+    if old_file:
+        shutil.copymode(archive, tmp)
+    os.replace(tmp, archive)
+
+def _flush_update(zip_file, old_file, item, compress_type):
+    """Запись элемента обновляемого архива: заново сжатого или скопированного из старого архива"""
+    path, arcname, old, future = item
+    result = future.result()
+    if result is not None:
+        return _flush_member(zip_file, (path, arcname, future), compress_type), True
+
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = old.compress_type
+    zinfo.CRC = old.CRC
+    zinfo.file_size = old.file_size
+    zinfo.compress_size = old.compress_size
+    with phase("copy"):
+        old_file.fp.seek(_data_offset(old_file.fp, old))
+        _write_member(zip_file, zinfo, old_file.fp, old.compress_size)
+    return arcname, False
+
+def member_target(root, name):
+    """
+    Безопасный путь извлечения элемента архива: абсолютные пути и '..' отбрасываются
+    Args:
+        root: Директория извлечения
+        name: Имя элемента в архиве
+    Returns:
+        str | None: Путь внутри root или None, если имя пустое
+    """
+    name = member_name(name)
+    return os.path.join(root, *name.split("/")) if name else None
+
+class MemberSelection:
+    """
+    Выбор элементов архива по именам и шаблонам fnmatch
+    Шаблон сравнивается с полным именем элемента и с каждой родительской директорией,
+    поэтому имя директории выбирает все ее содержимое.
+    """
+
+    def __init__(self, include=(), exclude=()):
+        """
+        Args:
+            include: Имена или шаблоны выбираемых элементов; пусто - все элементы
+            exclude: Имена или шаблоны исключаемых элементов
+        """
+        self.include = [member_name(pattern) for pattern in include]
+        self.exclude = [member_name(pattern) for pattern in exclude]
+        self.pending = {pattern for pattern in self.include if not any(char in pattern for char in "*?[")}
+        self.literal = len(self.pending) == len(self.include)
+        self.matched = False
+
+    @staticmethod
+    def _matches(name, patterns):
+        prefix = name
+        while prefix:
+            if any(fnmatchcase(prefix, pattern) for pattern in patterns):
+                return True
+            prefix = prefix.rpartition("/")[0]
+        return False
+
+    def __call__(self, name, is_dir=False):
+        """
+        Выбран ли элемент
+        Args:
+            name: Имя элемента в архиве
+            is_dir: Является ли элемент директорией; выбранный файл с точным именем
+                отмечается как найденный
+        """
+        name = member_name(name)
+        if self.exclude and self._matches(name, self.exclude):
+            return False
+        if self.include and not self._matches(name, self.include):
+            return False
+        self.matched = True
+        if not is_dir:
+            self.pending.discard(name)
+        return True
+
+    @property
+    def complete(self):
+        """Все элементы выбраны только по точным именам файлов и уже найдены"""
+        return bool(self.include) and self.literal and not self.pending
+
+def _make_dirs(path, created):
+    """Создание директорий с запоминанием созданных для отката"""
+    missing = []
+    while path and not os.path.isdir(path):
+        missing.append(path)
+        path = os.path.dirname(path)
+    for directory in reversed(missing):
+        os.mkdir(directory)
+        created.append(directory)
+
+def _extract_verified(zip_file, member, part):
+    """Извлечение элемента во временный файл; CRC проверяется при чтении"""
+    with phase("extract"), zip_file.open(member) as source, open(part, "wb") as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+
+def extract_zip_verified(archive, extract_path, jobs=1, select=None):
+    """
+    Извлечение zip архива за один проход с проверкой CRC каждого элемента
+    Элементы пишутся во временные файлы *.part и переименовываются только
+    после проверки всех элементов; при ошибке извлеченные данные удаляются.
+    Args:
+        archive: Путь к архиву
+        extract_path: Директория извлечения
+        jobs: Количество потоков извлечения
+        select: MemberSelection или None для всех элементов; остальные элементы не читаются
+    Returns:
+        list: Имена извлеченных элементов
+    """
+    created = []
+    parts = []
+    try:
+        _make_dirs(os.path.abspath(extract_path), created)
+        with zipfile.ZipFile(archive) as zip_file:
+            files = []
+            for member in zip_file.infolist():
+                target = member_target(extract_path, member.filename)
+                if target is None or (select is not None and not select(member.filename, member.is_dir())):
+                    continue
+                if member.is_dir():
+                    _make_dirs(target, created)
+                    continue
+                _make_dirs(os.path.dirname(target), created)
+                files.append((member, target))
+
+            parts = [target + ".part" for _, target in files]
+            run_parallel(lambda item: _extract_verified(zip_file, item[0], item[1] + ".part"), files, jobs)
+    except BaseException:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+        for directory in reversed(created):
+            os.rmdir(directory)
+        raise
+
+    for _, target in files:
+        os.replace(target + ".part", target)
+    return [member.filename for member, _ in files]
+
+TAR_COMPRESSORS = {
+    "gz": lambda data, level: gzip.compress(data, 6 if level is None else level, mtime=0),
+    "bz2": lambda data, level: bz2.compress(data, 9 if level is None else max(level, 1)),
+    "xz": lambda data, level: lzma.compress(data, preset=6 if level is None else level),
+    "none": None,
+}
+"""Функции сжатия блока tar потока; результаты для соседних блоков можно склеивать"""
+
+class ParallelBlockWriter(io.RawIOBase):
+    """
+    Поток записи, который сжимает данные независимыми блоками в пуле потоков
+    Каждый блок становится отдельным gzip/bz2/xz потоком, их конкатенация -
+    корректный многочленный архив, который читают стандартные модули.
+    """
+
+    def __init__(self, fileobj, compress, pool, jobs, block_size=TAR_BLOCK_SIZE):
+        super().__init__()
+        self.fileobj = fileobj
+        self.compress = compress
+        self.pool = pool
+        self.window = jobs * 2
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.pending = deque()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block):
+        self.pending.append(self.pool.submit(self.compress, block))
+        while len(self.pending) >= self.window:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def close(self):
+        if not self.closed:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+        super().close()
+
+def load_snapshot(path):
+    """
+    Загрузка файла снимка инкрементального архива
+    Returns:
+        dict | None: имя в архиве -> [inode, размер, mtime_ns] или None, если снимка нет
+    Raises:
+        ValueError: Если файл снимка поврежден
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)["files"]
+    except FileNotFoundError:
+        return None
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid snapshot {path}: {e}")
+
+def save_snapshot(path, files):
+    """Атомарная запись файла снимка"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump({"files": files}, file)
+    os.replace(tmp, path)
+
+def plan_incremental(files, snapshot):
+    """
+    Выбор файлов для инкрементального архива
+    Файл сохраняется, если его нет в снимке или изменились inode, размер или mtime.
+    Args:
+        files: Пары (путь к файлу, имя в архиве)
+        snapshot: Предыдущий снимок или None для полного архива
+    Returns:
+        tuple: (пары измененных файлов, имена удаленных файлов, новый снимок)
+    """
+    fresh_after = time.time_ns() - MTIME_SETTLE_NS
+    snapshot = snapshot or {}
+    changed = []
+    current = {}
+    with phase("compare"):
+        for path, arcname in files:
+            info = os.stat(path)
+            state = [info.st_ino, info.st_size, info.st_mtime_ns]
+            if snapshot.get(arcname) != state:
+                changed.append((path, arcname))
+            current[arcname] = state if info.st_mtime_ns < fresh_after else [info.st_ino, info.st_size, -1]
+    deleted = sorted(set(snapshot) - set(current))
+    return changed, deleted, current
+
+_INCREMENTAL_PAX_KEY = "SHELL.incremental"
+"""Pax-заголовок, которым помечен список удаленных файлов инкрементального архива"""
+
+def _is_deletion_list(member):
+    """Является ли элемент списком удаленных файлов: имя, pax-метка и первое место в архиве проверяет вызывающий"""
+    return member.name == TAR_INCREMENTAL_MEMBER and member.pax_headers.get(_INCREMENTAL_PAX_KEY) == "1"
+
+def _add_members(tar, files, deleted):
+    """Запись элементов в tar; для инкрементального архива первым идет список удаленных файлов"""
+    if deleted is not None:
+        data = json.dumps({"deleted": deleted}).encode()
+        info = tarfile.TarInfo(TAR_INCREMENTAL_MEMBER)
+        info.size = len(data)
+        info.mtime = time.time()
+        info.pax_headers = {_INCREMENTAL_PAX_KEY: "1"}
+        tar.addfile(info, io.BytesIO(data))
+    for path, arcname in files:
+        tar.add(path, arcname)
+        yield arcname
+
+def write_tar(folder, archive, jobs=None, compression="gz", level=None, snapshot=None):
+    """
+    Создание tar архива с параллельным блочным сжатием (как pigz)
+    Args:
+        folder: Исходная директория
+        archive: Путь к создаваемому архиву
+        jobs: Количество потоков сжатия
+        compression: Сжатие: "gz", "bz2", "xz" или "none"
+        level: Уровень сжатия, None - по умолчанию для выбранного алгоритма
+        snapshot: Файл снимка для инкрементального архива: сохраняются только файлы,
+            изменившиеся с момента снимка, и список удаленных; снимок обновляется после записи.
+            Если файла снимка нет, создается полный архив
+    Yields:
+        str: Имя добавленного элемента
+    Raises:
+        ValueError: Если в директории есть файл с зарезервированным именем TAR_INCREMENTAL_MEMBER
+    """
+    files = iter_files(folder, skip=archive)
+    if any(arcname == TAR_INCREMENTAL_MEMBER for _, arcname in files):
+        raise ValueError(f"{TAR_INCREMENTAL_MEMBER} is reserved for incremental archives")
+    deleted = None
+    if snapshot is not None:
+        files = [item for item in files if os.path.abspath(item[0]) != os.path.abspath(snapshot)]
+        files, deleted, current = plan_incremental(files, load_snapshot(snapshot))
+    compress = TAR_COMPRESSORS[compression]
+
+    if compress is None:
+        with tarfile.open(archive, "w") as tar:
+            yield from _add_members(tar, files, deleted)
+    else:
+        def compress_block(block):
+            with phase("compress"):
+                return compress(block, level)
+
+        jobs = jobs or default_jobs()
+        with open(archive, "wb") as raw, ThreadPoolExecutor(jobs) as pool:
+            with ParallelBlockWriter(raw, compress_block, pool, jobs) as writer:
+                with tarfile.open(fileobj=writer, mode="w|") as tar:
+                    yield from _add_members(tar, files, deleted)
+
+    if snapshot is not None:
+        save_snapshot(snapshot, current)
+
+TAR_STREAM_ERRORS = (tarfile.TarError, EOFError, OSError, zlib.error, lzma.LZMAError)
+"""Ошибки чтения поврежденного сжатого tar потока"""
+
+def open_decompressed(fileobj):
+    """
+    Распаковывающий поток по сигнатуре сжатия
+    В отличие от режима tarfile "r|*", поддерживает многочленные gzip/bz2/xz,
+    которые создает write_tar. Перемотка потока не требуется, поэтому
+    подходят каналы и stdin.
+    Args:
+        fileobj: Бинарный поток
+    Returns:
+        Поток распакованных данных
+    """
+    if not hasattr(fileobj, "peek"):
+        fileobj = io.BufferedReader(fileobj)
+    head = fileobj.peek(6)[:6]
+    if head.startswith(b"\x1f\x8b"):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if head.startswith(b"BZh"):
+        return bz2.BZ2File(fileobj)
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return lzma.LZMAFile(fileobj)
+    return fileobj
+
+def open_tar_stream(fileobj):
+    """
+    Открытие tar архива в потоковом режиме без предварительного чтения списка элементов
+    Raises:
+        tarfile.ReadError: Если поток не является tar архивом
+    """
+    return tarfile.open(fileobj=open_decompressed(fileobj), mode="r|")
+
+def _apply_deletions(tar, member, extract_path):
+    """
+    Удаление файлов из списка инкрементального архива и опустевших после этого директорий
+    Yields:
+        str: Имя удаленного файла
+    """
+    root = os.path.abspath(extract_path)
+    for name in json.load(tar.extractfile(member))["deleted"]:
+        target = member_target(root, name)
+        if target is None or not os.path.lexists(target) or os.path.isdir(target):
+            continue
+        os.remove(target)
+        yield name
+        parent = os.path.dirname(target)
+        while parent != root and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+def extract_tar_stream(tar, extract_path, select=None, on_delete=None):
+    """
+    Извлечение элементов по мере их чтения из потока
+    Данные невыбранных элементов пропускаются без записи; если все элементы выбраны
+    по точным именам файлов и найдены, чтение архива прекращается. Список удаленных
+    файлов инкрементального архива (помеченный первый элемент) применяется только
+    при извлечении всего архива.
+    Args:
+        tar: Архив, открытый open_tar_stream
+        extract_path: Директория извлечения
+        select: MemberSelection или None для всех элементов
+        on_delete: Функция (имя), вызываемая для каждого удаленного файла
+    Yields:
+        str: Имя извлеченного элемента
+    """
+    for index, member in enumerate(tar):
+        if index == 0 and _is_deletion_list(member):
+            if select is None:
+                with phase("extract"):
+                    for name in _apply_deletions(tar, member, extract_path):
+                        if on_delete is not None:
+                            on_delete(name)
+            continue
+        if select is not None and not select(member.name, member.isdir()):
+            continue
+        with phase("extract"):
+            tar.extract(member, extract_path, filter="data")
+        yield member.name
+        if select is not None and select.complete:
+            return
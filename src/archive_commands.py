@@ -0,0 +1,289 @@
+from pathlib import Path
+import sys
+import zipfile
+import zlib
+
+from src import vfs
+from src.archive import (TAR_COMPRESSORS, TAR_STREAM_ERRORS, MemberSelection, extract_tar_stream,
+                         extract_zip_verified, open_tar_stream, update_zip, write_tar, write_zip)
+from src.const import CHUNK_SIZE
+from src.errors import *
+from src.logger import log_command, log_success, log_error, log_file_event
+from src.parser import flag_value, flag_values, int_flag
+
+
+def create_zip(folder, archive, flags=()):
+    """
+    создание zip архива
+    Args:
+        folder: Путь к исходной директории
+        archive: Путь к создаваемому архиву
+        flags: Флаги команды (-j N - количество потоков сжатия, --level N - уровень сжатия 0-9,
+            -u - обновление существующего архива, --checksum - сравнение по CRC32 при обновлении)
+    Raises:
+        FileNotFoundError: Если директория не существует
+        NotADirectoryError: Если путь не является директорией
+        ArchiveError: Если произошла ошибка при создании архива
+    """
+
+    folder = Path(folder)
+    archive = Path(archive)
+
+    if not folder.exists():
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+    if not folder.is_dir():
+        raise NotADirectoryError(f"Folder {folder} is not a directory")
+
+    jobs = int_flag(flags, "-j")
+    level = int_flag(flags, "--level", zlib.Z_DEFAULT_COMPRESSION, minimum=0, maximum=9)
+
+    if "-u" in flags:
+        log_command(f"Updating zip {archive}")
+        try:
+            compressed = reused = 0
+            for arcname, changed in update_zip(folder, archive, jobs, level, "--checksum" in flags):
+                if changed:
+                    log_file_event("Added", arcname)
+                    compressed += 1
+                else:
+                    reused += 1
+            log_success(f"Updated {archive}: {compressed} compressed, {reused} reused")
+            print(f"{compressed} files compressed, {reused} reused")
+        except Exception as e:
+            log_error(f"Failed to update zip: {e}")
+            raise ArchiveError(f"Failed to update zip: {e}")
+        return
+
+    log_command(f"Creating zip {archive}")
+
+    try:
+        for arcname in write_zip(folder, archive, jobs, level):
+            log_file_event("Added", arcname)
+        log_success(f"Created {archive}")
+    except Exception as e:
+        log_error(f"Failed to create zip: {e}")
+        raise ArchiveError(f"Failed to create zip: {e}")
+
+def _selection(flags, members=()):
+    """Выбор элементов по именам и флагам --include/--exclude или None для всего архива"""
+    include = list(members) + flag_values(flags, "--include")
+    exclude = flag_values(flags, "--exclude")
+    return MemberSelection(include, exclude) if include or exclude else None
+
+def extract_zip(archive, extract_path = None, flags=(), members=()):
+    """
+    извлечение zip архива
+    CRC элементов проверяется во время записи; при ошибке извлеченные файлы удаляются
+    Args:
+        archive: Путь к архиву
+        extract_path: Путь для извлечения
+        flags: Флаги команды (-j N - количество потоков извлечения,
+            --include/--exclude шаблон - выбор элементов)
+        members: Имена извлекаемых элементов; пусто - весь архив
+    Raises:
+        FileNotFoundError: Если архив не существует или не найден ни один выбранный элемент
+        InvalidArchiveError: Если файл не является zip архивом
+        ArchiveError: Если произошла ошибка при извлечении
+    """
+
+    archive = Path(archive)
+
+    if not archive.exists():
+        raise FileNotFoundError(f"File {archive} does not exist")
+    if not zipfile.is_zipfile(archive):
+        raise InvalidArchiveError(f"File {archive} is not a zip file")
+
+    if extract_path is None:
+        extract_path = archive.parent / archive.stem
+    else:
+        extract_path = Path(extract_path)
+
+    jobs = int_flag(flags, "-j", 1)
+    select = _selection(flags, members)
+    if select is not None:
+        with zipfile.ZipFile(archive) as zip_file:
+            if not any(select(info.filename, info.is_dir()) for info in zip_file.infolist()):
+                raise FileNotFoundError(f"No matching members in {archive} (the extraction path is set with -d)")
+
+    log_command(f"Extracting {archive}")
+
+    try:
+        for file in extract_zip_verified(archive, extract_path, jobs, select):
+            log_file_event("Extracted", file)
+
+    except Exception as e:
+        log_error(f"Failed to extract zip: {e}")
+        raise ArchiveError(f"Failed to extract zip: {e}")
+
+def create_tar(folder, archive, flags=()):
+    """
+    создание tar архива
+    Args:
+        folder: Путь к исходной директории
+        archive : Путь к создаваемому архиву
+        flags: Флаги команды (-j N - количество потоков сжатия, --level N - уровень сжатия,
+            --compress gz|bz2|xz|none - алгоритм сжатия, --incremental снимок - инкрементальный архив)
+    Raises:
+        FileNotFoundError: Если директория не существует
+        InvalidInputError: Если указан неизвестный алгоритм сжатия
+        ArchiveError: Если произошла ошибка при создании архива
+    """
+    folder = Path(folder)
+    archive = Path(archive)
+
+    if not folder.exists():
+        raise FileNotFoundError(f"Folder {folder} does not exist")
+
+    jobs = int_flag(flags, "-j")
+    level = int_flag(flags, "--level", minimum=0, maximum=9)
+    compression = flag_value(flags, "--compress", "gz")
+    if compression not in TAR_COMPRESSORS:
+        raise InvalidInputError(f"Unknown compression: {compression}")
+    snapshot = flag_value(flags, "--incremental")
+    if snapshot == "":
+        raise InvalidInputError("--incremental requires a snapshot file")
+
+    log_command(f"Creating tar {archive}")
+
+    try:
+        for arcname in write_tar(folder, archive, jobs, compression, level, snapshot):
+            log_file_event("Added", arcname)
+        log_success(f"Created {archive}")
+    except Exception as e:
+        log_error(f"Failed to create tar: {e}")
+        raise ArchiveError(f"Failed to create tar: {e}")
+
+def extract_tar(archive, extract_path = None, flags=()):
+    """
+    извлечение tar архива
+    Архив читается одним проходом в потоковом режиме, поэтому подходят каналы;
+    "-" означает стандартный ввод. Для инкрементального архива из извлеченного
+    дерева удаляются файлы, удаленные с момента предыдущего архива цепочки.
+     Args:
+        archive: Путь к архиву или "-"
+        extract_path: Путь для извлечения
+        flags: Флаги команды (--include/--exclude шаблон - выбор элементов)
+    Raises:
+        FileNotFoundError: Если архив не существует или не найден ни один выбранный элемент
+        InvalidArchiveError: Если файл не является tar архивом
+        ArchiveError: Если произошла ошибка при извлечении
+    """
+    from_stdin = str(archive) == "-"
+    archive = Path(archive)
+
+    if not from_stdin and not archive.exists():
+        raise FileNotFoundError(f"File {archive} does not exist")
+
+    if extract_path is None and from_stdin:
+        extract_path = Path.cwd()
+    elif extract_path is None:
+        archive_name = archive.stem
+        if archive_name.endswith('.tar'):
+            archive_name = archive_name[:-4]
+        extract_path = archive.parent / archive_name
+    else:
+        extract_path = Path(extract_path)
+
+    select = _selection(flags)
+
+    log_command(f"Extracting {archive}")
+    source = sys.stdin.buffer if from_stdin else open(archive, "rb")
+    try:
+        try:
+            tar = open_tar_stream(source)
+        except TAR_STREAM_ERRORS:
+            raise InvalidArchiveError(f"File {archive} is not a tar file")
+
+        extract_path.mkdir(parents=True, exist_ok=True)
+        with tar:
+            for file in extract_tar_stream(tar, extract_path, select,
+                                           lambda name: log_file_event("Deleted", name)):
+                log_file_event("Extracted", file)
+        log_success(f"Extracted {archive}")
+    except TAR_STREAM_ERRORS as e:
+        log_error(f"Failed to extract tar: {e}")
+        raise ArchiveError(f"Failed to extract tar: {e}")
+    finally:
+        if not from_stdin:
+            source.close()
+    if select is not None and not select.matched:
+        raise FileNotFoundError(f"No matching members in {archive}")
+
+def print_members(archive, members=(), flags=(), out=None):
+    """
+    вывод содержимого элементов архива в поток без записи на диск (unzip -p, untar -p)
+    Элементы файла архива читаются через индекс vfs: zip - по центральному каталогу,
+    tar - с ближайшей точки восстановления; tar из стандартного ввода читается потоком.
+    Args:
+        archive: Путь к zip или tar архиву или "-"
+        members: Имена элементов
+        flags: Флаги команды (--include/--exclude шаблон)
+        out: Бинарный поток вывода, по умолчанию sys.stdout.buffer
+    Returns:
+        int: Количество выведенных байт
+    Raises:
+        FileNotFoundError: Если архив не существует или не найден ни один выбранный элемент
+        InvalidArchiveError: Если файл не является архивом
+    """
+    select = _selection(flags, members) or MemberSelection()
+    log_command(f"Printing {archive}")
+    if out is None:
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+
+    total = 0
+    if str(archive) == "-":
+        try:
+            with open_tar_stream(sys.stdin.buffer) as tar:
+                for member in tar:
+                    if member.isfile() and select(member.name):
+                        source = tar.extractfile(member)
+                        while chunk := source.read(CHUNK_SIZE):
+                            out.write(chunk)
+                            total += len(chunk)
+        except TAR_STREAM_ERRORS as e:
+            raise InvalidArchiveError(f"Standard input is not a tar stream: {e}")
+    else:
+        index = vfs.get_index(str(archive))
+        for inner in index.files():
+            if select(inner):
+                with index.open(inner) as source:
+                    while chunk := source.read(CHUNK_SIZE):
+                        out.write(chunk)
+                        total += len(chunk)
+    out.flush()
+    if not select.matched:
+        raise FileNotFoundError(f"No matching members in {archive}")
+    return total
+
+def run_zip(flags, args):
+    """Обработчик команды zip"""
+    create_zip(args[0], args[1], flags)
+
+def run_unzip(flags, args):
+    """
+    Обработчик команды unzip: unzip архив [элемент...] [-d путь], unzip -p архив элемент...
+    Все аргументы после архива - имена элементов; путь извлечения задается только флагом -d
+    """
+    if "-p" in flags:
+        print_members(args[0], args[1:], flags)
+        return
+    extract_zip(args[0], flag_value(flags, "-d") or None, flags, args[1:])
+
+def run_tar(flags, args):
+    """Обработчик команды tar"""
+    create_tar(args[0], args[1], flags)
+
+def run_untar(flags, args):
+    """
+    Обработчик команды untar: untar архив [путь] [--include/--exclude шаблон], untar -p архив элемент...
+    untar полный инкремент... путь - восстановление цепочки инкрементальных архивов по порядку
+    """
+    if "-p" in flags:
+        print_members(args[0], args[1:], flags)
+        return
+    if len(args) < 3:
+        extract_tar(args[0], args[1] if len(args) > 1 else None, flags)
+        return
+    for archive in args[:-1]:
+        extract_tar(archive, args[-1], flags)
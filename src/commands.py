@@ -1,27 +1,37 @@
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import heapq
+import importlib
 import stat
 import os
-import shutil
+import sys
+import time
 
-import zipfile
-import tarfile
+from src import vfs
+from src.const import CHUNK_SIZE
 from src.errors import *
-from src.logger import log_command, log_success, log_error
+from src.logger import log_command, log_success, log_file_event
+from src.parser import int_flag
 
 
 def ls(path="."):
     """
     команда ls без флага -l
     Args:
-        path: Путь к директории
+        path: Путь к директории; zip и tar архивы открываются как директории
     Returns:
         list: Список имен файлов и директорий
     Raises:
         FileNotFoundError: Если директория не существует
         NotADirectoryError: Если путь не является директорией
     """
-    directory = Path(path).resolve()
+    target = vfs.resolve(path)
+    if isinstance(target, vfs.ArchivePath):
+        return vfs.listdir(target)
+
+    directory = Path(target).resolve()
 
     if not directory.exists():
         raise FileNotFoundError(f"Directory {directory} does not exist")
@@ -31,84 +41,126 @@ def ls(path="."):
 
     return [file.name for file in directory.iterdir()]
 
-def ls_l(path="."):
-    """
-    команда ls с флагом -r
-    Args:
-        path: Путь к директории
-    Returns:
-        list: Список строк
-    Raises:
-        FileNotFoundError: Если директория не существует
-        NotADirectoryError: Если путь не является директорией
-        PermissionError: Если доступ к директории запрещен
-    """
-    directory = Path(path).resolve()
+def _permissions(mode):
+    """Строка прав доступа в стиле ls -l"""
+    perm = ""
 
-    if not directory.exists():
-        raise FileNotFoundError(f"Directory {directory} does not exist")
+    if stat.S_ISDIR(mode):
+        perm += "d"
+    if stat.S_ISLNK(mode):
+        perm += "l"
+    else:
+        perm += "-"
 
-    if not directory.is_dir():
-        raise NotADirectoryError(f"Directory {directory} is not a directory")
+    perm += 'd' if mode & stat.S_ISDIR(mode) else '-'
+    perm += 'r' if mode & stat.S_IRUSR else '-'
+    perm += 'w' if mode & stat.S_IWUSR else '-'
+    perm += 'x' if mode & stat.S_IXUSR else '-'
 
-    def permissions(mode):
-        perm = ""
+    perm += 'r' if mode & stat.S_IRGRP else '-'
+    perm += 'w' if mode & stat.S_IWGRP else '-'
+    perm += 'x' if mode & stat.S_IXGRP else '-'
 
-        if stat.S_ISDIR(mode):
-            perm += "d"
-        if stat.S_ISLNK(mode):
-            perm += "l"
-        else:
-            perm += "-"
+    perm += 'r' if mode & stat.S_IROTH else '-'
+    perm += 'w' if mode & stat.S_IWOTH else '-'
+    perm += 'x' if mode & stat.S_IXOTH else '-'
 
-        perm += 'd' if mode & stat.S_ISDIR(mode) else '-'
-        perm += 'r' if mode & stat.S_IRUSR else '-'
-        perm += 'w' if mode & stat.S_IWUSR else '-'
-        perm += 'x' if mode & stat.S_IXUSR else '-'
+    return perm
 
-        perm += 'r' if mode & stat.S_IRGRP else '-'
-        perm += 'w' if mode & stat.S_IWGRP else '-'
-        perm += 'x' if mode & stat.S_IXGRP else '-'
+@lru_cache(maxsize=4096)
+def _format_minute(minute):
+    """Время изменения с точностью до минуты (кэшируется)"""
+    return datetime.fromtimestamp(minute * 60).strftime('%b %d %H:%M')
 
-        perm += 'r' if mode & stat.S_IROTH else '-'
-        perm += 'w' if mode & stat.S_IWOTH else '-'
-        perm += 'x' if mode & stat.S_IXOTH else '-'
+def _format_row(name, mode, size, mtime):
+    """Строка вывода ls -l"""
+    return f"{_permissions(mode)} {size:8} {_format_minute(int(mtime // 60))} {name}"
 
-        return perm
+def _scan_directory(directory):
+    """
+    Обход директории через os.scandir без построения списка
+    Args:
+        directory: Путь к директории
+    Yields:
+        tuple: (name, mode, size, mtime)
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                stat_info = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            yield entry.name, stat_info.st_mode, stat_info.st_size, stat_info.st_mtime
 
-    def time(time):
-        dt = datetime.fromtimestamp(time)
-        return dt.strftime('%b %d %H:%M')
+LS_SORT_KEYS = {
+    "name": (lambda row: row[0], False),
+    "size": (lambda row: row[2], True),
+    "mtime": (lambda row: row[3], True),
+}
+"""Ключи сортировки ls -l: (функция ключа, по убыванию)"""
 
-    result = []
-    try:
-        items = list(directory.iterdir())
-        items.sort(key = lambda x: x.name)
-        for item in items:
-            try:
-                if item.is_symlink():
-                    stat_info = item.lstat()
-                else:
-                    stat_info = item.stat()
+def iter_ls_l(path=".", sort_by="name", limit=None):
+    """
+    потоковая команда ls -l на основе os.scandir
+    Args:
+        path: Путь к директории; zip и tar архивы открываются как директории
+        sort_by: Ключ сортировки ("name", "size", "mtime") или None без сортировки
+        limit: Количество выводимых строк; при сортировке используется куча
+    Yields:
+        str: Строка с правами, размером, временем и именем
+    Raises:
+        FileNotFoundError: Если директория не существует
+        NotADirectoryError: Если путь не является директорией
+        PermissionError: Если доступ к директории запрещен
+    """
+    target = vfs.resolve(path)
+    if isinstance(target, vfs.ArchivePath):
+        rows = vfs.scan(target)
+    else:
+        directory = Path(target).resolve()
 
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory {directory} does not exist")
 
-                perm = permissions(stat_info.st_mode)
-                size = stat_info.st_size
-                mtime = time(stat_info.st_mtime)
-                name = item.name
+        if not directory.is_dir():
+            raise NotADirectoryError(f"Directory {directory} is not a directory")
 
-                result.append(f"{perm} {size:8} {mtime} {name}")
-            except (PermissionError, OSError):
-                continue
+        rows = _scan_directory(directory)
+
+    try:
+        if sort_by is None:
+            rows = islice(rows, limit)
+        else:
+            key, reverse = LS_SORT_KEYS[sort_by]
+            if limit is not None:
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                rows = select(limit, rows, key=key)
+            else:
+                rows = sorted(rows, key=key, reverse=reverse)
+        for row in rows:
+            yield _format_row(*row)
     except PermissionError as e:
         raise PermissionError(f"Permission error: {e}")
-    return result
+
+def ls_l(path="."):
+    """
+    команда ls с флагом -l
+    Args:
+        path: Путь к директории
+    Returns:
+        list: Список строк, отсортированный по имени
+    Raises:
+        FileNotFoundError: Если директория не существует
+        NotADirectoryError: Если путь не является директорией
+        PermissionError: Если доступ к директории запрещен
+    """
+    return list(iter_ls_l(path))
 
 def cd(path="."):
     """
     команда cd
     Args:
-        path: Путь к целевой директории
+        path: Путь к целевой директории; в zip и tar архив можно перейти как в директорию
     Returns:
         str: Новый путь директории
     Raises:
@@ -118,6 +170,13 @@ def cd(path="."):
     if not path:
         return ""
 
+    target = vfs.resolve(path)
+    if isinstance(target, vfs.ArchivePath):
+        vfs.chdir(target)
+        return str(target)
+    if vfs.in_archive():
+        path = target
+
     directory = Path(path)
 
     if path == '.':
@@ -141,6 +200,7 @@ def cd(path="."):
     if not directory.is_absolute():
         directory = Path.cwd() / directory
 
+    vfs.chdir(None)
     os.chdir(str(directory))
     return str(directory)
 
@@ -148,14 +208,19 @@ def cat(path):
     """
     команда cat
     Args:
-        path: Путь к файлу
+        path: Путь к файлу или к элементу архива
     Returns:
         str: Содержимое файла
     Raises:
         FileNotFoundError: Если файл не существует
         IsADirectoryError: Если путь является директорией
     """
-    directory = Path(path)
+    target = vfs.resolve(path)
+    if isinstance(target, vfs.ArchivePath) and target.inner:
+        with vfs.open_member(target) as file:
+            return file.read().decode("utf-8")
+
+    directory = Path(target)
     if not directory.exists():
         raise FileNotFoundError(f"Directory {directory} does not exist")
     if directory.is_dir():
@@ -163,273 +228,109 @@ def cat(path):
 
     return directory.read_text(encoding="utf-8")
 
-def cp(dir_get, dir_to, flags):
-    """
-    команда cp
-    Args:
-        dir_get: Источник копирования
-        dir_to: Целевой путь
-        flags: Флаги команды
-    Raises:
-        FileNotFoundError: Если источник не существует
-        IsADirectoryError: Если источник является директорией без флага -r
-        NotADirectoryError: Если источник не является директорией с флагом -r
-        FileExistsError: Если целевая директория уже существует
-    """
-    directory_get = Path(dir_get)
-    directory_to = Path(dir_to)
-
-    if not directory_get.exists():
-        raise FileNotFoundError(f"File {directory_get} does not exist")
-
-    if  directory_to.exists() and  directory_to.is_dir():
-        final_dir =  directory_to / directory_get.name
-    else:
-        final_dir =  directory_to
-
-    if final_dir.exists() and  directory_to.samefile(final_dir):
-        raise ValueError(f"Directory {directory_get} already exists")
-
-    if "-r" in flags:
-        if not directory_get.is_dir():
-            raise NotADirectoryError(f"Source is not a directory")
-        if final_dir.exists():
-            raise FileExistsError(f"Directory {final_dir} already exists")
-        return shutil.copytree(directory_get, final_dir)
-    else:
-        if directory_get.is_dir():
-            raise IsADirectoryError(f"Source is not a directory")
-
-        return shutil.copy2(directory_get, final_dir)
-
-def mv(dir_get, dir_to):
-    """
-    команда mv
-    Args:
-        dir_get (str): Источник перемещения
-        dir_to (str): Целевой путь
-    Raises:
-        FileNotFoundError: Если источник не существует
-    """
-    directory_get = Path(dir_get)
-    directory_to = Path(dir_to)
-
-    if not directory_get.exists():
-        raise FileNotFoundError(f"File {directory_get} does not exist")
-    if directory_to.is_dir() and directory_to.exists():
-        directory_to2 = directory_to / directory_get.name
-        return shutil.move(directory_get, directory_to2)
-    elif directory_to.is_dir() and not directory_to.exists():
-        return shutil.move(directory_get, directory_to)
-    elif not(directory_to.is_dir() and directory_to.exists()):
-        return shutil.move(directory_get, directory_to)
-
-def rm(dir_del, flag):
-    """
-    команда rm
-    Args:
-        dir_del: Путь к удаляемому объекту
-        flag: Флаг
-    Raises:
-        NotADirectoryError: Если объект не существует
-        PermissionError: Если попытка удалить защищенную директорию
-        NotFlagError: Если для удаления директории не указан флаг -r
-        InvalidInputError: Если ввод пользователя неверен
-    """
-
-    directory_del = Path(dir_del).resolve()
-    if not directory_del.exists():
-        raise NotADirectoryError(f"Directory {directory_del} does not exist")
-
-    ogr_paths = {Path("\\"), Path("~"), Path.home().resolve(), Path.cwd().parent.resolve()}
-
-    if directory_del.resolve() in ogr_paths:
-        raise PermissionError(f"Directory {directory_del} cannot be removed")
-
-    if directory_del.is_file():
-            return os.remove(directory_del)
-    elif directory_del.is_dir():
-        if flag and flag[0] == "-r":
-            confirmation_user = input(f"Remove {directory_del}? [y/n]: ").strip().lower()
-            if confirmation_user == "y":
-                shutil.rmtree(directory_del)
-            elif confirmation_user == "n":
-                return print("cancellation")
-            else:
-                raise InvalidInputError(f"Invalid input: {confirmation_user}")
-        else:
-            raise NotFlagError("for delete directory use flag: -r")
-    else:
-        raise ValueError(f"{directory_del} is not a directory ir file")
-
-def create_zip(folder, archive):
+def cat_stream(path, out=None, chunk_size=CHUNK_SIZE):
     """
-    создание zip архива
+    потоковая команда cat: файл выводится блоками фиксированного размера
+    Элемент архива читается без распаковки остальных элементов.
     Args:
-        folder: Путь к исходной директории
-        archive: Путь к создаваемому архиву
-    Raises:
-        FileNotFoundError: Если директория не существует
-        NotADirectoryError: Если путь не является директорией
-        ArchiveError: Если произошла ошибка при создании архива
-    """
-
-    folder = Path(folder)
-    archive = Path(archive)
-
-    if not folder.exists():
-        raise FileNotFoundError(f"Folder {folder} does not exist")
-    if not folder.is_dir():
-        raise NotADirectoryError(f"Folder {folder} is not a directory")
-
-    log_command(f"Creating zip {archive}")
-
-    try:
-        with zipfile.ZipFile(archive, "w") as zip_file:
-            for file in folder.rglob("*"):
-                if file.is_file():
-                    try:
-                        arcname = file.relative_to(folder)
-                    except ValueError:
-                        arcname = file.name
-                    zip_file.write(file, arcname)
-                    log_success(f"Added {arcname}")
-        log_success(f"Created {archive}")
-    except Exception as e:
-        log_error(f"Failed to create zip: {e}")
-        raise ArchiveError(f"Failed to create zip: {e}")
-
-def extract_zip(archive, extract_path = None):
-    """
-    извлечение zip архива
-    Args:
-        archive: Путь к архиву
-        extract_path: Путь для извлечения
-    Raises:
-        FileNotFoundError: Если архив не существует
-        InvalidArchiveError: Если файл не является zip архивом
-        ArchiveError: Если произошла ошибка при извлечении
-    """
-
-    archive = Path(archive)
-
-    if not archive.exists():
-        raise FileNotFoundError(f"File {archive} does not exist")
-    if not zipfile.is_zipfile(archive):
-        raise InvalidArchiveError(f"File {archive} is not a zip file")
-
-    if extract_path is None:
-        extract_path = archive.parent / archive.stem
-    else:
-        extract_path = Path(extract_path)
-
-    extract_path.mkdir(parents=True, exist_ok=True)
-
-    log_command(f"Extracting {archive}")
-
-    try:
-        with zipfile.ZipFile(archive, "r") as zip_file:
-            file = zip_file.testzip()
-            if file is not None:
-                raise InvalidArchiveError(f"File {file} already exists")
-            file_list = zip_file.namelist()
-
-            zip_file.extractall(extract_path)
-
-            for file in file_list:
-                log_success(f"Extracted {file}")
-
-    except Exception as e:
-        log_error(f"Failed to extract zip: {e}")
-        raise ArchiveError(f"Failed to extract zip: {e}")
-
-def create_tar(folder, archive):
-    """
-    создание tar архива
-    Args:
-        folder: Путь к исходной директории
-        archive : Путь к создаваемому архиву
-    Raises:
-        FileNotFoundError: Если директория не существует
-        ArchiveError: Если произошла ошибка при создании архива
-    """
-    folder = Path(folder)
-    archive = Path(archive)
-
-    if not folder.exists():
-        raise FileNotFoundError(f"Folder {folder} does not exist")
-
-    log_command(f"Creating tar {archive}")
-
-    try:
-        with tarfile.open(archive, "w:gz") as tar:
-            for file in folder.rglob("*"):
-                if file.is_file():
-                    try:
-                        arcname = file.relative_to(folder)
-                    except ValueError:
-                        arcname = file.name
-                    tar.add(file, arcname)
-                    log_success(f"Added {arcname}")
-            log_success(f"Created {archive}")
-    except Exception as e:
-        log_error(f"Failed to create tar: {e}")
-        raise ArchiveError(f"Failed to create tar: {e}")
-
-def extract_tar(archive, extract_path = None):
-    """
-    извлечение tar архива
-     Args:
-        archive: Путь к архиву
-        extract_path: Путь для извлечения
+        path: Путь к файлу или к элементу архива
+        out: Бинарный поток вывода, по умолчанию sys.stdout.buffer
+        chunk_size: Размер блока чтения
+    Returns:
+        int: Количество выведенных байт
     Raises:
-        FileNotFoundError: Если архив не существует
-        InvalidArchiveError: Если файл не является tar архивом
-        ArchiveError: Если произошла ошибка при извлечении
+        FileNotFoundError: Если файл не существует
+        IsADirectoryError: Если путь является директорией
     """
-    archive = Path(archive)
-
-    if not archive.exists():
-        raise FileNotFoundError(f"File {archive} does not exist")
-    if not tarfile.is_tarfile(archive):
-        raise InvalidArchiveError(f"File {archive} is not a tar file")
-
-    if extract_path is None:
-        archive_name = archive.stem
-        if archive_name.endswith('.tar'):
-            archive_name = archive_name[:-4]
-        extract_path = archive.parent / archive_name
+    target = vfs.resolve(path)
+    if isinstance(target, vfs.ArchivePath) and target.inner:
+        source = vfs.open_member(target)
     else:
-        extract_path = Path(extract_path)
-
-    extract_path.mkdir(parents=True, exist_ok=True)
-
-    log_command(f"Extracting {archive}")
-    try:
-        with tarfile.open(archive, "r:*") as tar:
-            file_list = tar.getnames()
-            tar.extractall(extract_path)
-            for file in file_list:
-                log_success(f"Extracted {file}")
-        log_success(f"Extracted {archive}")
-    except tarfile.TarError as e:
-        log_error(f"Failed to extract tar: {e}")
-        raise ArchiveError(f"Failed to extract tar: {e}")
-
-
-
-
-
-
-
-
-
-
-
-        
-    
-
-    
-    
-
-
+        directory = Path(target)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory {directory} does not exist")
+        if directory.is_dir():
+            raise IsADirectoryError(f"Directory {directory} is a directory")
+        source = open(directory, "rb", buffering=0)
+
+    if out is None:
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+    with source as file:
+        while True:
+            read = file.readinto(buffer)
+            if not read:
+                break
+            out.write(view[:read])
+            total += read
+    out.flush()
+    return total
+
+def run_ls(flags, args):
+    """Обработчик команды ls"""
+    path = args[0] if args else "."
+    if '-l' not in flags:
+        files = ls(path)
+        for file in files:
+            print(file)
+            log_file_event("Listed", file)
+        log_success(f"ls {path}: {len(files)} items")
+        return
+
+    sort_by = "name"
+    if "-U" in flags:
+        sort_by = None
+    elif "-S" in flags:
+        sort_by = "size"
+    elif "-t" in flags:
+        sort_by = "mtime"
+    count = 0
+    for row in iter_ls_l(path, sort_by, int_flag(flags, "--top")):
+        print(row)
+        count += 1
+    log_success(f"ls -l {path}: {count} items")
+
+def run_cd(flags, args):
+    """Обработчик команды cd"""
+    cd(args[0] if args else "~")
+
+def run_pwd(flags, args):
+    """Обработчик команды pwd"""
+    print(vfs.getcwd())
+    log_command(vfs.getcwd())
+
+def run_cat(flags, args):
+    """Обработчик команды cat"""
+    if not args:
+        print("")
+        return
+    start = time.perf_counter()
+    size = cat_stream(args[0])
+    print()
+    log_success(f"cat {args[0]}: {size} bytes in {time.perf_counter() - start:.3f}s")
+
+_LAZY_COMMANDS = {
+    "cp": "src.file_commands",
+    "mv": "src.file_commands",
+    "rm": "src.file_commands",
+    "cp_many": "src.file_commands",
+    "mv_many": "src.file_commands",
+    "rm_many": "src.file_commands",
+    "create_zip": "src.archive_commands",
+    "extract_zip": "src.archive_commands",
+    "create_tar": "src.archive_commands",
+    "extract_tar": "src.archive_commands",
+    "du": "src.usage",
+}
+"""Команды из модулей, которые импортируются при первом обращении"""
+
+def __getattr__(name):
+    """Ленивый импорт тяжелых команд: from src.commands import create_zip"""
+    module = _LAZY_COMMANDS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
@@ -1,2 +1,102 @@
-COMMANDS = ("ls", "pwd", "cd", "cat", "cp", "mv", "rm", "zip", "unzip", "tar", "untar")
-"""Кортеж поддерживаемых команд"""
\ No newline at end of file
+COMMAND_SPECS = {
+    "ls": ("src.commands:run_ls", 0, ("--top",), slice(None), ()),
+    "pwd": ("src.commands:run_pwd", 0, (), slice(0), ()),
+    "cd": ("src.commands:run_cd", 0, (), slice(0, 1), ()),
+    "cat": ("src.commands:run_cat", 0, (), slice(0, 1), ()),
+    "cp": ("src.file_commands:run_cp", 2, ("-j",), slice(None), ()),
+    "mv": ("src.file_commands:run_mv", 2, ("-j",), slice(None), ()),
+    "rm": ("src.file_commands:run_rm", 1, ("-j",), slice(None), ()),
+    "zip": ("src.archive_commands:run_zip", 2, ("-j", "--level"), slice(None), ()),
+    "unzip": ("src.archive_commands:run_unzip", 1, ("-j", "--include", "--exclude", "-d"), slice(0, 1), ("-d",)),
+    "tar": ("src.archive_commands:run_tar", 2, ("-j", "--level", "--compress", "--incremental"), slice(None),
+            ("--incremental",)),
+    "untar": ("src.archive_commands:run_untar", 1, ("--include", "--exclude"), slice(None), ()),
+    "du": ("src.usage:run_du", 0, ("--max-depth", "--top", "-j"), slice(None), ()),
+    "dedup": ("src.dedup:run_dedup", 0, ("-j",), slice(None), ()),
+    "find": ("src.search:run_find", 0, ("--name", "--size", "--mtime", "--type", "-j"), slice(None), ()),
+    "grep": ("src.search:run_grep", 1, ("-j",), slice(1, None), ()),
+    "stats": ("src.stats:run_stats", 0, (), slice(0), ()),
+    "jobs": ("src.jobs:run_jobs", 0, (), slice(0), ()),
+    "wait": ("src.jobs:run_wait", 0, (), slice(0), ()),
+    "kill": ("src.jobs:run_kill", 1, (), slice(0), ()),
+}
+"""Встроенные команды: имя -> (обработчик "модуль:функция", минимальное количество аргументов,
+флаги, принимающие значение следующим аргументом, срез аргументов-путей, флаги, значение которых - путь).
+Срез путей без конца (slice(None), slice(1, None)) означает список путей, по умолчанию - текущая директория"""
+
+COMMANDS = tuple(COMMAND_SPECS)
+"""Кортеж поддерживаемых команд"""
+
+PLUGIN_ENTRY_POINT_GROUP = "console_app.commands"
+"""Группа entry points, через которую пакеты-плагины регистрируют команды"""
+
+VALUE_FLAGS = tuple(dict.fromkeys(flag for spec in COMMAND_SPECS.values() for flag in spec[2]))
+"""Все флаги со значением; у команды, которая такой флаг не объявляет, он считается ошибкой"""
+
+
+CHUNK_SIZE = 1024 * 1024
+"""Размер блока потокового чтения файлов, байт"""
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+"""Размер буфера копирования файлов, байт"""
+
+KERNEL_COPY_THRESHOLD = 1024 * 1024
+"""Минимальный размер файла для копирования средствами ядра, байт"""
+
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+"""Размер сжатых данных, после которого они сбрасываются во временный файл, байт"""
+
+SPOOL_MEMORY_LIMIT = 256 * 1024 * 1024
+"""Суммарный объем памяти буферов сжатых элементов zip, ожидающих записи, байт"""
+
+TAR_BLOCK_SIZE = 4 * 1024 * 1024
+"""Размер независимо сжимаемого блока tar потока, байт"""
+
+TAR_INCREMENTAL_MEMBER = ".shell_incremental.json"
+"""Служебный элемент инкрементального tar архива со списком удаленных файлов"""
+
+LOG_BATCH_SIZE = 256
+"""Количество записей журнала, после которого буфер сбрасывается на диск"""
+
+LOG_FLUSH_INTERVAL = 1.0
+"""Максимальный интервал сброса журнала и сводок файловых событий, секунд"""
+
+JOB_WORKERS = 4
+"""Количество одновременно выполняемых фоновых задач"""
+
+TRASH_DIR_NAME = ".shell_trash"
+"""Имя директории корзины для rm --defer"""
+
+TRASH_INDEX_NAME = ".shell_trash_index"
+"""Файл в домашней директории со списком корзин"""
+
+DU_CACHE_NAME = ".shell_du_cache"
+"""Файл в домашней директории с кэшем размеров директорий для du --cache"""
+
+MTIME_SETTLE_NS = 2 * 10 ** 9
+"""Запись, измененная позже этого срока, не считается неизменной (кэш du, снимок tar):
+изменение в тот же тик mtime было бы незаметно"""
+
+PARTIAL_HASH_SIZE = 4096
+"""Размер начала и конца файла, по которым dedup отсеивает кандидатов до полного хэширования, байт"""
+
+SEARCH_QUEUE_SIZE = 1024
+"""Размер очереди результатов find и grep; при заполнении обход ждет потребителя"""
+
+BINARY_CHECK_SIZE = 8192
+"""Размер начала файла, по которому grep определяет двоичные файлы, байт"""
+
+STATS_WINDOW = 1000
+"""Количество последних выполнений команды, по которым stats считает процентили"""
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+"""Расширения файлов, которые ls, cat и cd открывают как директории"""
+
+VFS_CACHE_DIR = ".shell_vfs_cache"
+"""Директория в домашней директории с индексами tar архивов"""
+
+VFS_CACHE_SIZE = 8
+"""Количество открытых индексов архивов в памяти"""
+
+VFS_CHECKPOINT_SPACING = 16 * 1024 * 1024
+"""Расстояние между снимками состояния распаковки gzip, байт распакованных данных"""
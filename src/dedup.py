@@ -0,0 +1,181 @@
+from collections import defaultdict
+from dataclasses import dataclass
+import hashlib
+import os
+import stat
+import time
+
+from src.const import PARTIAL_HASH_SIZE
+from src.logger import log_success, log_warning
+from src.parser import confirm, int_flag
+from src.stats import phase
+from src.transfer import file_hash, run_parallel
+
+
+@dataclass
+class DedupStats:
+    """Статистика поиска дубликатов"""
+    files: int = 0
+    partial_hashed: int = 0
+    full_hashed: int = 0
+    groups: int = 0
+    duplicates: int = 0
+    bytes: int = 0
+    linked: int = 0
+    reclaimed: int = 0
+    seconds: float = 0.0
+
+    def __str__(self):
+        result = (f"{self.files} files, {self.groups} groups, {self.duplicates} duplicates, "
+                  f"{self.bytes} bytes reclaimable; hashed {self.partial_hashed} partially, "
+                  f"{self.full_hashed} fully in {self.seconds:.3f}s")
+        if self.linked:
+            result += f"; linked {self.linked}, reclaimed {self.reclaimed} bytes"
+        return result
+
+def partial_hash(path):
+    """
+    Хэш первых и последних PARTIAL_HASH_SIZE байт файла
+    Для файлов не длиннее 2 * PARTIAL_HASH_SIZE хэш покрывает все содержимое.
+    """
+    with open(path, "rb") as file:
+        data = file.read(PARTIAL_HASH_SIZE)
+        size = os.fstat(file.fileno()).st_size
+        if size > PARTIAL_HASH_SIZE:
+            file.seek(max(PARTIAL_HASH_SIZE, size - PARTIAL_HASH_SIZE))
+            data += file.read(PARTIAL_HASH_SIZE)
+    return hashlib.blake2b(data).hexdigest()
+
+def _group_by(paths, key, jobs):
+    """Группировка путей по значению функции, вычисляемой параллельно; одиночные группы отбрасываются"""
+    groups = defaultdict(list)
+    with phase(key.__name__):
+        values = run_parallel(key, paths, jobs)
+    for path, value in zip(paths, values):
+        groups[value].append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def _iter_paths(roots):
+    """
+    Пути файлов в директориях и сами файлы из roots
+    Raises:
+        FileNotFoundError: Если путь не существует
+    """
+    for root in roots:
+        if not os.path.exists(root):
+            raise FileNotFoundError(f"Path {root} does not exist")
+        if not os.path.isdir(root):
+            yield root
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                yield os.path.join(dirpath, name)
+
+def find_duplicates(roots, jobs=None):
+    """
+    Поиск одинаковых файлов: размер -> хэш начала и конца -> полный хэш
+    Полностью читаются только файлы, совпавшие на первых двух этапах. Пустые файлы,
+    символические ссылки и повторные жесткие ссылки на один inode не рассматриваются.
+    Args:
+        roots: Директории или файлы для поиска
+        jobs: Количество потоков хэширования
+    Returns:
+        tuple: (группы одинаковых файлов, словарь путь -> os.stat_result, DedupStats)
+    """
+    start = time.perf_counter()
+    stats = DedupStats()
+    infos = {}
+    inodes = set()
+    by_size = defaultdict(list)
+    with phase("walk"):
+        for path in _iter_paths(roots):
+            info = os.lstat(path)
+            if not stat.S_ISREG(info.st_mode) or info.st_size == 0 or (info.st_dev, info.st_ino) in inodes:
+                continue
+            inodes.add((info.st_dev, info.st_ino))
+            infos[path] = info
+            by_size[info.st_size].append(path)
+    stats.files = len(infos)
+
+    groups = []
+    for same_size in (group for group in by_size.values() if len(group) > 1):
+        stats.partial_hashed += len(same_size)
+        for same_partial in _group_by(same_size, partial_hash, jobs):
+            if infos[same_partial[0]].st_size <= 2 * PARTIAL_HASH_SIZE:
+                groups.append(same_partial)
+                continue
+            stats.full_hashed += len(same_partial)
+            groups.extend(_group_by(same_partial, file_hash, jobs))
+
+    groups = [sorted(group) for group in groups]
+    groups.sort(key=lambda group: infos[group[0]].st_size * (len(group) - 1), reverse=True)
+    stats.groups = len(groups)
+    stats.duplicates = sum(len(group) - 1 for group in groups)
+    stats.bytes = sum(infos[group[0]].st_size * (len(group) - 1) for group in groups)
+    stats.seconds = time.perf_counter() - start
+    return groups, infos, stats
+
+def _unchanged(path, info):
+    """Файл не изменился после хэширования"""
+    current = os.lstat(path)
+    return (current.st_ino, current.st_size, current.st_mtime_ns) == (info.st_ino, info.st_size, info.st_mtime_ns)
+
+def link_duplicates(groups, infos, stats):
+    """
+    Замена дубликатов жесткими ссылками на первый файл группы
+    Ссылка создается под временным именем и атомарно заменяет дубликат. Файлы на другой
+    файловой системе или измененные после хэширования пропускаются.
+    Args:
+        groups: Группы одинаковых файлов
+        infos: Результаты stat, полученные при поиске
+        stats: Статистика, в которую добавляются linked и reclaimed
+    """
+    for keep, *duplicates in groups:
+        for duplicate in duplicates:
+            if infos[duplicate].st_dev != infos[keep].st_dev:
+                log_warning(f"dedup: {duplicate} is on another filesystem, skipped")
+                continue
+            if not (_unchanged(keep, infos[keep]) and _unchanged(duplicate, infos[duplicate])):
+                log_warning(f"dedup: {duplicate} changed since hashing, skipped")
+                continue
+            tmp = f"{duplicate}.dedup-{os.getpid()}"
+            os.link(keep, tmp)
+            try:
+                os.replace(tmp, duplicate)
+            except OSError:
+                os.unlink(tmp)
+                raise
+            stats.linked += 1
+            stats.reclaimed += infos[duplicate].st_size
+
+def dedup(roots, flags):
+    """
+    команда dedup
+    Args:
+        roots: Директории или файлы для поиска
+        flags: Флаги (--link - замена дубликатов жесткими ссылками, -f - без подтверждения,
+            -j N - количество потоков хэширования)
+    Returns:
+        tuple: (группы одинаковых файлов, DedupStats)
+    Raises:
+        FileNotFoundError: Если путь не существует
+        InvalidInputError: Если ввод пользователя неверен
+    """
+    groups, infos, stats = find_duplicates(roots or ["."], int_flag(flags, "-j"))
+    if "--link" in flags and groups:
+        if "-f" not in flags:
+            if not confirm(f"Replace {stats.duplicates} duplicates with hardlinks?"):
+                print("cancellation")
+                return groups, stats
+        link_duplicates(groups, infos, stats)
+    return groups, stats
+
+def run_dedup(flags, args):
+    """Обработчик команды dedup"""
+    groups, stats = dedup(args, flags)
+    for group in groups:
+        print(f"{len(group)} x {os.path.getsize(group[0])} bytes:")
+        for path in group:
+            print(f"  {path}")
+    print(stats)
+    log_success(f"dedup {' '.join(args) or '.'}: {stats}")
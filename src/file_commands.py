@@ -0,0 +1,335 @@
+from pathlib import Path
+import os
+import shutil
+import stat
+import time
+
+from src import vfs
+from src.errors import *
+from src.logger import log_success
+from src.parser import confirm, int_flag
+from src.remove import RemoveStats, remove_files, remove_tree
+from src.trash import defer_remove, start_purger
+from src.transfer import TransferStats, copy_file, copy_tree, run_parallel, sync_tree
+
+
+def cp(dir_get, dir_to, flags):
+    """
+    команда cp
+    Args:
+        dir_get: Источник копирования
+        dir_to: Целевой путь
+        flags: Флаги команды (-r, -j N - количество потоков, --sync - синхронизация копии
+            с источником, --checksum - сравнение по хэшу, --delete - удаление лишних файлов копии).
+            Копия для -r и --sync одна и та же: dir_to/<имя источника>, если dir_to - существующая
+            директория, иначе dir_to
+    Returns:
+        TransferStats | str: Статистика копирования для -r, иначе путь к копии
+    Raises:
+        FileNotFoundError: Если источник не существует
+        IsADirectoryError: Если источник является директорией без флага -r
+        NotADirectoryError: Если источник не является директорией с флагом -r
+        FileExistsError: Если целевая директория уже существует
+    """
+    directory_get = Path(dir_get)
+    directory_to = Path(dir_to)
+
+    if not directory_get.exists():
+        raise FileNotFoundError(f"File {directory_get} does not exist")
+
+    if  directory_to.exists() and  directory_to.is_dir():
+        final_dir =  directory_to / directory_get.name
+    else:
+        final_dir =  directory_to
+
+    if final_dir.exists() and directory_get.samefile(final_dir):
+        raise shutil.SameFileError(f"{directory_get} and {final_dir} are the same file")
+
+    if "-r" in flags:
+        if not directory_get.is_dir():
+            raise NotADirectoryError(f"Source is not a directory")
+        if directory_get.resolve() in final_dir.resolve().parents:
+            raise ValueError(f"Directory {directory_get} cannot be copied into itself")
+        if "--sync" in flags:
+            return sync_tree(directory_get, final_dir, int_flag(flags, "-j"),
+                             "--checksum" in flags, "--delete" in flags)
+        if final_dir.exists():
+            raise FileExistsError(f"Directory {final_dir} already exists")
+        return copy_tree(directory_get, final_dir, int_flag(flags, "-j"))
+    else:
+        if directory_get.is_dir():
+            raise IsADirectoryError(f"Source is not a directory")
+
+        return copy_file(directory_get, final_dir)
+
+def mv(dir_get, dir_to):
+    """
+    команда mv
+    Args:
+        dir_get (str): Источник перемещения
+        dir_to (str): Целевой путь
+    Raises:
+        FileNotFoundError: Если источник не существует
+    """
+    directory_get = Path(dir_get)
+    directory_to = Path(dir_to)
+
+    if not directory_get.exists():
+        raise FileNotFoundError(f"File {directory_get} does not exist")
+    if directory_to.is_dir() and directory_to.exists():
+        directory_to2 = directory_to / directory_get.name
+        return shutil.move(directory_get, directory_to2, copy_function=copy_file)
+    elif directory_to.is_dir() and not directory_to.exists():
+        return shutil.move(directory_get, directory_to, copy_function=copy_file)
+    elif not(directory_to.is_dir() and directory_to.exists()):
+        return shutil.move(directory_get, directory_to, copy_function=copy_file)
+
+def _check_removable(path):
+    """
+    Проверка, что путь не является защищенной директорией
+    Raises:
+        PermissionError: Если путь защищен от удаления
+    """
+    ogr_paths = {Path("\\"), Path("~"), Path.home().resolve(), Path.cwd().parent.resolve()}
+
+    if path.resolve() in ogr_paths:
+        raise PermissionError(f"Directory {path} cannot be removed")
+
+def _stat_sources(sources, follow_symlinks=True):
+    """
+    Однократный stat всех источников пакетной команды
+    Args:
+        sources: Пути источников
+        follow_symlinks: Следовать ли символическим ссылкам
+    Returns:
+        list: Пары (Path, os.stat_result)
+    Raises:
+        FileNotFoundError: Если какой-либо источник не существует
+        ValueError: Если у источников совпадают имена
+    """
+    entries = []
+    names = set()
+    for source in sources:
+        path = Path(source)
+        try:
+            entries.append((path, os.stat(path, follow_symlinks=follow_symlinks)))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File {path} does not exist")
+        if path.name in names:
+            raise ValueError(f"Duplicate source name {path.name}")
+        names.add(path.name)
+    return entries
+
+def _target_dir(dir_to):
+    """
+    Целевая директория пакетной команды
+    Raises:
+        NotADirectoryError: Если цель не является существующей директорией
+    """
+    directory_to = Path(dir_to)
+    if not directory_to.is_dir():
+        raise NotADirectoryError(f"Target {directory_to} is not a directory")
+    return directory_to
+
+def cp_many(sources, dir_to, flags):
+    """
+    команда cp с несколькими источниками: cp a b c dir/
+    Все источники и цели проверяются до начала копирования; stat каждого источника
+    выполняется один раз, файлы копируются параллельно, директории (-r) - по очереди
+    параллельным copy_tree.
+    Args:
+        sources: Источники копирования
+        dir_to: Существующая целевая директория
+        flags: Флаги команды (-r, -j N - количество потоков)
+    Returns:
+        TransferStats: Суммарная статистика копирования
+    Raises:
+        FileNotFoundError: Если источник не существует
+        NotADirectoryError: Если цель не является директорией
+        IsADirectoryError: Если источник является директорией без флага -r
+        FileExistsError: Если целевая директория уже существует
+        ValueError: Если источник совпадает с целью, цель лежит внутри источника-директории
+            или у источников совпадают имена
+    """
+    if "--sync" in flags:
+        raise InvalidInputError("--sync takes a single source directory")
+    start = time.perf_counter()
+    directory_to = _target_dir(dir_to)
+    jobs = int_flag(flags, "-j")
+    files = []
+    dirs = []
+    for source, info in _stat_sources(sources):
+        target = directory_to / source.name
+        if target.exists() and source.samefile(target):
+            raise ValueError(f"File {source} already exists")
+        if stat.S_ISDIR(info.st_mode):
+            if "-r" not in flags:
+                raise IsADirectoryError(f"Source {source} is a directory")
+            if source.resolve() in target.resolve().parents:
+                raise ValueError(f"Directory {source} cannot be copied into itself")
+            if target.exists():
+                raise FileExistsError(f"Directory {target} already exists")
+            dirs.append((source, target))
+        else:
+            files.append((source, target, info.st_size))
+
+    stats = TransferStats(files=len(files), bytes=sum(size for _, _, size in files))
+    run_parallel(lambda item: copy_file(item[0], item[1]), files, jobs)
+    for source, target in dirs:
+        tree = copy_tree(source, target, jobs)
+        stats.files += tree.files
+        stats.bytes += tree.bytes
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+def mv_many(sources, dir_to, flags):
+    """
+    команда mv с несколькими источниками: mv a b c dir/
+    Перемещения выполняются параллельно: переименования в пределах файловой системы
+    дешевы, а перемещения между файловыми системами копируют данные.
+    Args:
+        sources: Источники перемещения
+        dir_to: Существующая целевая директория
+        flags: Флаги команды (-j N - количество потоков)
+    Returns:
+        int: Количество перемещенных объектов
+    Raises:
+        FileNotFoundError: Если источник не существует
+        NotADirectoryError: Если цель не является директорией
+        ValueError: Если у источников совпадают имена
+    """
+    directory_to = _target_dir(dir_to)
+    entries = _stat_sources(sources, follow_symlinks=False)
+    run_parallel(lambda entry: shutil.move(entry[0], directory_to / entry[0].name, copy_function=copy_file),
+                 entries, int_flag(flags, "-j"))
+    return len(entries)
+
+def rm_many(paths, flags):
+    """
+    команда rm с несколькими путями: rm *.tmp
+    Файлы удаляются пакетно с группировкой по директориям, директории (-r) - через
+    remove_tree или перенос в корзину (--defer). Подтверждение для директорий запрашивается один раз.
+    Args:
+        paths: Удаляемые пути
+        flags: Флаги (-r, -f, -j N, --defer)
+    Returns:
+        RemoveStats | None: Суммарная статистика удаления
+    Raises:
+        NotADirectoryError: Если объект не существует
+        PermissionError: Если попытка удалить защищенную директорию
+        NotFlagError: Если для удаления директории не указан флаг -r
+        InvalidInputError: Если ввод пользователя неверен
+    """
+    start = time.perf_counter()
+    jobs = int_flag(flags, "-j")
+    files = []
+    dirs = []
+    for path in paths:
+        path = Path(path).absolute()
+        path = path.parent.resolve() / path.name
+        try:
+            info = os.lstat(path)
+        except FileNotFoundError:
+            raise NotADirectoryError(f"Directory {path} does not exist")
+        _check_removable(path)
+        if not stat.S_ISDIR(info.st_mode):
+            files.append(path)
+        elif "-r" in flags:
+            dirs.append(path)
+        else:
+            raise NotFlagError("for delete directory use flag: -r")
+
+    if dirs and "-f" not in flags:
+        if not confirm(f"Remove {len(dirs)} directories?"):
+            return print("cancellation")
+
+    stats = RemoveStats(files=remove_files(files, jobs))
+    for directory in dirs:
+        if "--defer" in flags:
+            defer_remove(directory, purge=False)
+            stats.deferred += 1
+        else:
+            tree = remove_tree(directory, jobs)
+            stats.files += tree.files
+            stats.dirs += tree.dirs
+    if stats.deferred:
+        start_purger()
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+def rm(dir_del, flag):
+    """
+    команда rm
+    Args:
+        dir_del: Путь к удаляемому объекту
+        flag: Флаги (-r - рекурсивное удаление, -f - без подтверждения, -j N - количество потоков,
+            --defer - перенос в корзину с фоновой очисткой)
+    Returns:
+        RemoveStats | Path | None: Статистика удаления директории или путь в корзине для --defer
+    Raises:
+        NotADirectoryError: Если объект не существует
+        PermissionError: Если попытка удалить защищенную директорию
+        NotFlagError: Если для удаления директории не указан флаг -r
+        InvalidInputError: Если ввод пользователя неверен
+    """
+
+    directory_del = Path(dir_del).resolve()
+    if not directory_del.exists():
+        raise NotADirectoryError(f"Directory {directory_del} does not exist")
+
+    _check_removable(directory_del)
+
+    if directory_del.is_file():
+            return os.remove(directory_del)
+    elif directory_del.is_dir():
+        if "-r" in flag:
+            jobs = int_flag(flag, "-j")
+            if "-f" not in flag:
+                if not confirm(f"Remove {directory_del}?"):
+                    return print("cancellation")
+            if "--defer" in flag:
+                return defer_remove(directory_del)
+            return remove_tree(directory_del, jobs)
+        else:
+            raise NotFlagError("for delete directory use flag: -r")
+    else:
+        raise ValueError(f"{directory_del} is not a directory ir file")
+
+def run_cp(flags, args):
+    """Обработчик команды cp"""
+    vfs.check_real_paths(args)
+    if len(args) > 2:
+        result = cp_many(args[:-1], args[-1], flags)
+        print(f"Copied {result}")
+        log_success(f"cp {len(args) - 1} sources {args[-1]}: {result}")
+        return
+    result = cp(args[0], args[1], flags)
+    if "-r" in flags:
+        print(f"Copied {result}")
+    log_success(f"cp {args[0]} {args[1]}: {result}")
+
+def run_mv(flags, args):
+    """Обработчик команды mv"""
+    vfs.check_real_paths(args)
+    if len(args) > 2:
+        count = mv_many(args[:-1], args[-1], flags)
+        log_success(f"mv {count} sources {args[-1]}")
+        return
+    mv(args[0], args[1])
+
+def run_rm(flags, args):
+    """Обработчик команды rm"""
+    vfs.check_real_paths(args)
+    if len(args) > 1:
+        result = rm_many(args, flags)
+        if result is not None:
+            print(f"Removed {result}")
+            log_success(f"rm {len(args)} paths: {result}")
+        return
+    result = rm(args[0], flags)
+    if isinstance(result, Path):
+        print(f"Moved {args[0]} to {result}, purging in background")
+        log_success(f"rm {args[0]}: moved to {result}")
+    elif result is not None:
+        print(f"Removed {result}")
+        log_success(f"rm {args[0]}: {result}")
@@ -0,0 +1,196 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+from src import vfs
+from src.const import JOB_WORKERS
+from src.errors import InvalidInputError
+from src.logger import log_error, log_success
+from src.registry import dispatch, find_command
+
+FOREGROUND_ONLY = ("cd", "jobs", "wait", "kill")
+"""Команды, которые нельзя запускать в фоне"""
+
+PROMPTING_FLAGS = {"rm": "-r", "dedup": "--link"}
+"""Команды, которые с этим флагом запрашивают подтверждение; в фоне для них нужен -f"""
+
+_jobs = {}
+_lock = threading.RLock()
+_pool = None
+_next_id = 1
+
+
+class Job:
+    """Фоновая задача оболочки"""
+
+    def __init__(self, job_id, line, command, flags, args, paths=()):
+        self.id = job_id
+        self.line = line
+        self.command = command
+        self.flags = flags
+        self.args = args
+        self.paths = {Path(path).resolve() for path in paths}
+        self.status = "queued"
+        self.deps = set()
+        self.done = threading.Event()
+
+    @property
+    def active(self):
+        """Задача ожидает запуска или выполняется"""
+        return self.status in ("queued", "running")
+
+    def conflicts(self, other):
+        """Пересекаются ли пути задач: совпадают или один вложен в другой"""
+        return any(a == b or a in b.parents or b in a.parents for a in self.paths for b in other.paths)
+
+def _start(job):
+    """Передача задачи в пул; вызывается под блокировкой"""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(JOB_WORKERS, thread_name_prefix="job")
+    job.status = "running"
+    try:
+        _pool.submit(_run, job)
+    except RuntimeError:
+        _finish(job, "killed")
+
+def _run(job):
+    """Выполнение задачи в рабочем потоке"""
+    try:
+        ok = dispatch(job.command, job.flags, job.args)
+    except Exception as e:
+        log_error(f"Job {job.id} crashed: {e}")
+        ok = False
+    _finish(job, "done" if ok else "failed")
+
+def _finish(job, status):
+    """Завершение задачи и запуск задач, ожидавших ее"""
+    with _lock:
+        job.status = status
+        for other in _jobs.values():
+            if other.status == "queued" and job in other.deps:
+                other.deps.discard(job)
+                if not other.deps:
+                    _start(other)
+    job.done.set()
+    log_success(f"[{job.id}] {status} {job.line}")
+    print(f"[{job.id}] {status} {job.line}")
+
+def _fix_paths(command, flags, args):
+    """
+    Фиксация путей задачи относительно текущей директории (в том числе внутри архива)
+    Абсолютными становятся только аргументы и значения флагов, объявленные командой
+    как пути; команде со списком путей без аргументов передается текущая директория.
+    Args:
+        command: Имя команды
+        flags: Флаги
+        args: Аргументы
+    Returns:
+        tuple: (flags, args, пути задачи для проверки пересечений)
+    """
+    spec = find_command(command)
+    if spec is None:
+        return flags, args, []
+    args = list(args)
+    paths = []
+    indexes = range(len(args))[spec.path_args]
+    for i in indexes:
+        if args[i] != "-":
+            args[i] = vfs.absolute_path(args[i])
+            paths.append(args[i])
+    if not indexes and spec.path_args.stop is None:
+        args.append(vfs.getcwd())
+        paths.append(args[-1])
+
+    fixed_flags = []
+    for flag in flags:
+        name, _, value = flag.partition("=")
+        if name in spec.path_flags and value:
+            value = vfs.absolute_path(value)
+            flag = f"{name}={value}"
+            paths.append(value)
+        fixed_flags.append(flag)
+    return fixed_flags, args, paths
+
+def submit_job(line, command, flags, args):
+    """
+    Запуск команды в фоне
+    Задача стартует сразу, если ее пути не пересекаются с путями активных задач,
+    иначе ждет их завершения в порядке постановки.
+    Args:
+        line: Строка команды без '&'
+        command: Имя команды
+        flags: Флаги
+        args: Аргументы; относительные пути фиксируются относительно текущей директории (_fix_paths)
+    Returns:
+        bool: True, если задача поставлена
+    """
+    global _next_id
+    if command in FOREGROUND_ONLY:
+        print(f"{command} cannot run in background")
+        return False
+    if PROMPTING_FLAGS.get(command) in flags and "-f" not in flags:
+        print(f"{command} {PROMPTING_FLAGS[command]} asks for confirmation: use -f to run it in background")
+        return False
+
+    flags, args, paths = _fix_paths(command, flags, args)
+    with _lock:
+        job = Job(_next_id, line, command, flags, args, paths)
+        _next_id += 1
+        job.deps = {other for other in _jobs.values() if other.active and job.conflicts(other)}
+        _jobs[job.id] = job
+        if not job.deps:
+            _start(job)
+        status = job.status
+    print(f"[{job.id}] {status} {line}")
+    return True
+
+def _get_job(job_id):
+    """Задача по номеру из аргумента команды"""
+    job = _jobs.get(int(job_id)) if str(job_id).isdigit() else None
+    if job is None:
+        raise InvalidInputError(f"No such job: {job_id}")
+    return job
+
+def wait_jobs(job_ids=()):
+    """
+    Ожидание завершения задач
+    Args:
+        job_ids: Номера задач; по умолчанию все
+    Returns:
+        bool: True, если ни одна задача не завершилась ошибкой
+    """
+    with _lock:
+        jobs = [_get_job(job_id) for job_id in job_ids] if job_ids else list(_jobs.values())
+    for job in jobs:
+        job.done.wait()
+    return all(job.status != "failed" for job in jobs)
+
+def kill_job(job_id):
+    """
+    Отмена задачи, которая еще не запущена
+    Raises:
+        InvalidInputError: Если задачи нет или она уже выполняется
+    """
+    with _lock:
+        job = _get_job(job_id)
+        if job.status == "running":
+            raise InvalidInputError(f"Job {job.id} is already running and cannot be killed")
+        if job.status == "queued":
+            _finish(job, "killed")
+
+def run_jobs(flags, args):
+    """Обработчик команды jobs"""
+    with _lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        print(f"[{job.id}] {job.status} {job.line}")
+
+def run_wait(flags, args):
+    """Обработчик команды wait"""
+    wait_jobs(args)
+
+def run_kill(flags, args):
+    """Обработчик команды kill"""
+    for job_id in args:
+        kill_job(job_id)
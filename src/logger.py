@@ -1,15 +1,98 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
+import time
 
+from src.const import LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL
 
-def setup_logging():
-    """Настройка системы логирования"""
-    logging.basicConfig(
-        filename='shell.log',
-        level=logging.INFO,
-        format='[%(asctime)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        encoding='utf-8'
-    )
+_listener = None
+_verbose = False
+_file_events = {}
+_file_events_lock = threading.Lock()
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """Файловый обработчик, сбрасывающий записи на диск пачками"""
+
+    def __init__(self, filename, batch_size=LOG_BATCH_SIZE, interval=LOG_FLUSH_INTERVAL, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self.pending += 1
+            if self.pending >= self.batch_size or time.monotonic() - self.last_flush >= self.interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Фоновый поток записи журнала: при простое сбрасывает буферы и сводки файловых событий"""
+
+    def __init__(self, log_queue, *handlers, interval=LOG_FLUSH_INTERVAL):
+        super().__init__(log_queue, *handlers)
+        self.interval = interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.interval)
+            except queue.Empty:
+                flush_file_events()
+                for handler in self.handlers:
+                    handler.flush()
+
+def setup_logging(background=True, verbose=False, level=logging.INFO):
+    """
+    Настройка системы логирования
+    Args:
+        background: Писать журнал в фоновом потоке через очередь, не блокируя команды
+        verbose: Записывать каждое файловое событие вместо периодических сводок
+        level: Минимальный уровень записываемых сообщений
+    """
+    global _listener, _verbose
+    _verbose = verbose
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    root.setLevel(level)
+    formatter = logging.Formatter('[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    if not background:
+        handler = logging.FileHandler('shell.log', encoding='utf-8')
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+        return
+
+    handler = BatchingFileHandler('shell.log', encoding='utf-8')
+    handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    _listener = BatchingQueueListener(log_queue, handler)
+    _listener.start()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Запись накопленных сводок и остановка фонового потока без потери сообщений"""
+    global _listener
+    flush_file_events()
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 def log_command(command):
     """Логирование введеной команды"""
@@ -25,4 +108,27 @@ def log_warning(warning_message):
 
 def log_success(success_message):
     """Логирование успешного выполнения команды"""
-    logging.info(success_message)
\ No newline at end of file
+    logging.info(success_message)
+
+def log_file_event(action, name):
+    """
+    Логирование события над отдельным файлом
+    В подробном режиме событие записывается сразу, иначе только увеличивается
+    счетчик, который попадет в периодическую сводку.
+    Args:
+        action: Действие, например "Added" или "Extracted"
+        name: Имя файла
+    """
+    if _verbose:
+        logging.info(f"{action} {name}")
+        return
+    with _file_events_lock:
+        _file_events[action] = _file_events.get(action, 0) + 1
+
+def flush_file_events():
+    """Запись сводки накопленных файловых событий"""
+    global _file_events
+    with _file_events_lock:
+        events, _file_events = _file_events, {}
+    for action, count in events.items():
+        logging.info(f"{action} {count} files")
@@ -1,26 +1,129 @@
+import glob
 import shlex
+import threading
+
+from src.const import VALUE_FLAGS
+from src.errors import InvalidInputError
+
+_prompts_enabled = True
+
+def _expand(token, raw):
+    """
+    Раскрытие шаблона аргумента (*, ?, [...]) в отсортированный список путей
+    Аргументы в кавычках или с экранированием не раскрываются; шаблон без
+    совпадений остается как есть.
+    Args:
+        token: Аргумент после разбора shlex
+        raw: Тот же аргумент в исходном виде
+    Returns:
+        list: Пути, подходящие под шаблон, или [token]
+    """
+    if not any(char in token for char in "*?[") or any(char in raw for char in "\"'\\"):
+        return [token]
+    return sorted(glob.glob(token, recursive=True)) or [token]
 
 def parse(cmd):
     """
     Парсинг введенной команды на составляющие.
+    Шаблоны в аргументах раскрываются в пути, как в командной оболочке.
+    Следующий аргумент забирают только флаги со значением, объявленные командой.
     Args:
         cmd: Введенная пользователем команда
     Returns:
         tuple:(command, flags, args)
+    Raises:
+        InvalidInputError: Если указан флаг со значением, которого у команды нет
     """
+    from src.registry import find_command
     flags = []
     args = []
 
     pars = shlex.split(cmd)
+    raw = shlex.split(cmd, posix=False)
+    if len(raw) != len(pars):
+        raw = pars
     command = pars[0]
-    part = pars[1:]
-    for i in part:
-        if i.startswith("-"):
+    spec = find_command(command)
+    value_flags = spec.value_flags if spec is not None else ()
+    part = iter(zip(pars[1:], raw[1:]))
+    for i, raw_i in part:
+        if i in value_flags:
+                flags.append(f"{i}={next(part, ('', ''))[0]}")
+        elif i in VALUE_FLAGS:
+                raise InvalidInputError(f"{command} does not take {i}")
+        elif i.startswith("-") and i != "-":
                 flags.append(i)
         else:
-                args.append(i)
+                args.extend(_expand(i, raw_i))
 
     return command, flags, args
 
+def flag_value(flags, name, default=None):
+    """
+    Значение флага вида name=value
+    Args:
+        flags: Флаги команды
+        name: Имя флага
+        default: Значение по умолчанию
+    Returns:
+        str: Значение последнего указанного флага или default
+    """
+    prefix = f"{name}="
+    for flag in reversed(flags):
+        if flag.startswith(prefix):
+            return flag[len(prefix):]
+    return default
+
+def flag_values(flags, name):
+    """
+    Все значения повторяемого флага вида name=value
+    Args:
+        flags: Флаги команды
+        name: Имя флага
+    Returns:
+        list: Значения в порядке указания
+    """
+    prefix = f"{name}="
+    return [flag[len(prefix):] for flag in flags if flag.startswith(prefix)]
+
+def int_flag(flags, name, default=None, minimum=1, maximum=None):
+    """
+    Целочисленное значение флага вида name=value
+    Raises:
+        InvalidInputError: Если значение не является целым числом в диапазоне [minimum, maximum]
+    """
+    value = flag_value(flags, name)
+    if value is None:
+        return default
+    if not value.isdigit() or int(value) < minimum or (maximum is not None and int(value) > maximum):
+        raise InvalidInputError(f"Invalid value for {name}: {value}")
+    return int(value)
 
+def set_prompts(enabled):
+    """
+    Включение и отключение запросов подтверждения (в сценариях ввод недоступен)
+    Returns:
+        bool: Предыдущее значение
+    """
+    global _prompts_enabled
+    previous, _prompts_enabled = _prompts_enabled, enabled
+    return previous
 
+def confirm(question):
+    """
+    Запрос подтверждения y/n у пользователя
+    Args:
+        question: Текст вопроса
+    Returns:
+        bool: True - "y", False - "n"
+    Raises:
+        InvalidInputError: Если ввод неверен или запросы отключены (сценарий или фоновая задача)
+    """
+    if not _prompts_enabled or threading.current_thread() is not threading.main_thread():
+        raise InvalidInputError(f"{question} - confirmation is not available here, use -f")
+    answer = input(f"{question} [y/n]: ").strip().lower()
+    if answer == "n":
+        return False
+    if answer != "y":
+        raise InvalidInputError(f"Invalid input: {answer}")
+    return True
@@ -0,0 +1,117 @@
+import importlib
+
+from src.const import COMMAND_SPECS, PLUGIN_ENTRY_POINT_GROUP
+from src.errors import *
+from src.logger import log_error
+
+COMMAND_ERRORS = (OSError, ValueError, InvalidInputError, NotFlagError, ArchiveError, InvalidArchiveError,
+                  LenArgsError)
+"""Ошибки команд, которые выводятся пользователю и записываются в журнал"""
+
+
+class CommandSpec:
+    """Описание команды: обработчик загружается при первом вызове"""
+    __slots__ = ("name", "target", "min_args", "value_flags", "path_args", "path_flags", "_handler")
+
+    def __init__(self, name, target, min_args=0, value_flags=(), path_args=slice(0), path_flags=()):
+        self.name = name
+        self.target = target
+        self.min_args = min_args
+        self.value_flags = tuple(value_flags)
+        self.path_args = path_args
+        self.path_flags = tuple(path_flags)
+        self._handler = None if isinstance(target, str) else target
+
+    @property
+    def handler(self):
+        """Функция-обработчик (flags, args); модуль импортируется один раз"""
+        if self._handler is None:
+            module, function = self.target.split(":")
+            self._handler = getattr(importlib.import_module(module), function)
+        return self._handler
+
+COMMAND_REGISTRY = {name: CommandSpec(name, *spec) for name, spec in COMMAND_SPECS.items()}
+"""Реестр команд: имя -> CommandSpec"""
+
+_plugins_loaded = False
+_command_hook = None
+
+def set_command_hook(hook):
+    """
+    Установка обертки вызова обработчиков (инструментация)
+    Args:
+        hook: Функция (command, handler, flags, args) или None для прямого вызова
+    """
+    global _command_hook
+    _command_hook = hook
+
+def register_command(name, target, min_args=0, value_flags=(), path_args=slice(0), path_flags=()):
+    """
+    Регистрация команды
+    Args:
+        name: Имя команды
+        target: Обработчик: строка "модуль:функция" или функция (flags, args)
+        min_args: Минимальное количество аргументов
+        value_flags: Флаги, принимающие значение следующим аргументом
+        path_args: Срез аргументов, которые являются путями (по умолчанию ни одного)
+        path_flags: Флаги со значением, которое является путем
+    """
+    COMMAND_REGISTRY[name] = CommandSpec(name, target, min_args, value_flags, path_args, path_flags)
+
+def load_plugins():
+    """
+    Регистрация команд из entry points группы PLUGIN_ENTRY_POINT_GROUP
+    Вызывается только для неизвестной команды, поэтому не влияет на запуск;
+    модули плагинов импортируются при первом вызове их команд.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=PLUGIN_ENTRY_POINT_GROUP):
+        if entry_point.name not in COMMAND_REGISTRY:
+            register_command(entry_point.name, entry_point.value)
+
+def find_command(name):
+    """Поиск команды в реестре, при промахе - среди плагинов"""
+    spec = COMMAND_REGISTRY.get(name)
+    if spec is None and not _plugins_loaded:
+        load_plugins()
+        spec = COMMAND_REGISTRY.get(name)
+    return spec
+
+def dispatch(command, flags, args):
+    """
+    Выполнение команды через реестр
+    Args:
+        command: Имя команды
+        flags: Флаги
+        args: Аргументы
+    Returns:
+        bool: True, если команда выполнена успешно
+    """
+    spec = find_command(command)
+    if spec is None:
+        log_error(f"Invalid command: {command}")
+        print(f"Invalid command: {command}")
+        return False
+
+    if len(args) < spec.min_args:
+        print(f"Error: {command} must have at least {spec.min_args} "
+              f"argument{'s' if spec.min_args > 1 else ''}")
+        return False
+
+    try:
+        if "--profile" in flags:
+            from src.stats import profile_command
+            profile_command(command, spec.handler, [flag for flag in flags if flag != "--profile"], args)
+        elif _command_hook is None:
+            spec.handler(flags, args)
+        else:
+            _command_hook(command, spec.handler, flags, args)
+    except COMMAND_ERRORS as e:
+        log_error(str(e))
+        print(e)
+        return False
+    return True
@@ -0,0 +1,211 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+import os
+import shutil
+import time
+
+from src.stats import phase
+from src.transfer import default_jobs, run_parallel
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+FD_DELETE_SUPPORTED = os.scandir in os.supports_fd and os.unlink in os.supports_dir_fd
+"""Поддерживает ли платформа обход и удаление относительно дескриптора директории"""
+
+
+@dataclass
+class RemoveStats:
+    """Статистика удаления"""
+    files: int = 0
+    dirs: int = 0
+    seconds: float = 0.0
+    deferred: int = 0
+
+    @property
+    def files_per_second(self):
+        """Скорость удаления, файлов/с"""
+        return self.files / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        result = (f"{self.files} files, {self.dirs} directories in {self.seconds:.3f}s "
+                  f"({self.files_per_second:.0f} files/s)")
+        if self.deferred:
+            result += f", moved {self.deferred} to trash"
+        return result
+
+class _Directory:
+    """Директория, открытая во время удаления дерева"""
+    __slots__ = ("fd", "name", "parent", "pending")
+
+    def __init__(self, fd, name, parent):
+        self.fd = fd
+        self.name = name
+        self.parent = parent
+        self.pending = 0
+
+def _open_directory(name, parent_fd, expected):
+    """
+    Открытие поддиректории относительно дескриптора родителя
+    Args:
+        name: Имя поддиректории
+        parent_fd: Дескриптор родительской директории
+        expected: stat поддиректории, полученный при обходе родителя
+    Returns:
+        int: Дескриптор поддиректории
+    Raises:
+        OSError: Если под этим именем теперь находится другой объект
+    """
+    fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+    if not os.path.samestat(os.fstat(fd), expected):
+        os.close(fd)
+        raise OSError(f"Directory {name} was replaced during removal")
+    return fd
+
+def _clear_directory(fd):
+    """
+    Удаление файлов директории относительно ее дескриптора
+    Args:
+        fd: Дескриптор директории
+    Returns:
+        tuple: (количество удаленных файлов, [(имя, stat)] поддиректорий)
+    """
+    removed = 0
+    subdirs = []
+    with phase("unlink"), os.scandir(fd) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.name, entry.stat(follow_symlinks=False)))
+            else:
+                os.unlink(entry.name, dir_fd=fd)
+                removed += 1
+    return removed, subdirs
+
+def _scan_subdirectory(directory, expected):
+    """
+    Открытие поддиректории и удаление ее файлов
+    Директория без поддиректорий сразу удаляется, не удерживая дескриптор.
+    Args:
+        directory: Поддиректория (_Directory) с открытым родителем
+        expected: stat поддиректории, полученный при обходе родителя
+    Returns:
+        tuple: Результат _clear_directory
+    """
+    directory.fd = _open_directory(directory.name, directory.parent.fd, expected)
+    removed, subdirs = _clear_directory(directory.fd)
+    if not subdirs:
+        _remove_subdirectory(directory)
+    return removed, subdirs
+
+def _remove_subdirectory(directory):
+    """Закрытие опустошенной поддиректории и ее удаление относительно дескриптора родителя"""
+    os.close(directory.fd)
+    directory.fd = None
+    with phase("rmdir"):
+        os.rmdir(directory.name, dir_fd=directory.parent.fd)
+
+def remove_files(paths, jobs=None):
+    """
+    Пакетное удаление файлов
+    Файлы группируются по родительской директории: каждая директория открывается
+    один раз, файлы удаляются относительно ее дескриптора; группы обрабатываются параллельно.
+    Args:
+        paths: Пути к файлам
+        jobs: Количество потоков
+    Returns:
+        int: Количество удаленных файлов
+    """
+    groups = {}
+    for path in paths:
+        parent, name = os.path.split(os.fspath(path))
+        groups.setdefault(parent or ".", []).append(name)
+
+    def remove_group(group):
+        parent, names = group
+        if not FD_DELETE_SUPPORTED:
+            for name in names:
+                os.unlink(os.path.join(parent, name))
+            return len(names)
+        fd = os.open(parent, _DIR_FLAGS)
+        try:
+            for name in names:
+                os.unlink(name, dir_fd=fd)
+        finally:
+            os.close(fd)
+        return len(names)
+
+    return sum(run_parallel(remove_group, list(groups.items()), jobs))
+
+def remove_tree(path, jobs=None):
+    """
+    Параллельное рекурсивное удаление директории
+    Файлы удаляются через unlink относительно дескриптора директории, поддеревья
+    обходятся в пуле потоков. Поддиректория открывается относительно дескриптора
+    родителя и сверяется со stat, полученным при обходе, а после очистки удаляется
+    через rmdir относительно того же дескриптора, поэтому подмена директории
+    символической ссылкой не уводит удаление за пределы дерева.
+    Args:
+        path: Удаляемая директория
+        jobs: Количество потоков
+    Returns:
+        RemoveStats: Статистика удаления
+    """
+    start = time.perf_counter()
+    path = os.fspath(path)
+    if not FD_DELETE_SUPPORTED:
+        files, dirs = 0, 1
+        for _, dirnames, filenames in os.walk(path):
+            files += len(filenames)
+            dirs += len(dirnames)
+        shutil.rmtree(path)
+        return RemoveStats(files, dirs, time.perf_counter() - start)
+
+    root = _Directory(os.open(path, _DIR_FLAGS), path, None)
+    opened = [root]
+    files = 0
+    dirs = 0
+    jobs = jobs or default_jobs()
+    try:
+        with ThreadPoolExecutor(jobs) as pool:
+            pending = {pool.submit(_clear_directory, root.fd): (root, False)}
+            # Поддиректории открываются в порядке обхода в глубину и не более 2 * jobs
+            # одновременно: дескрипторы удерживаются только вдоль обрабатываемых ветвей
+            waiting = []
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        directory, removing = pending.pop(future)
+                        result = future.result()
+                        if removing:
+                            dirs += 1
+                            directory = directory.parent
+                            directory.pending -= 1
+                        else:
+                            removed, subdirs = result
+                            files += removed
+                            directory.pending += len(subdirs)
+                            if not subdirs and directory.parent is not None:
+                                dirs += 1
+                                directory = directory.parent
+                                directory.pending -= 1
+                            for name, info in subdirs:
+                                waiting.append((_Directory(None, name, directory), info))
+                        if directory.pending == 0 and directory.parent is not None:
+                            pending[pool.submit(_remove_subdirectory, directory)] = (directory, True)
+                    while waiting and len(pending) < 2 * jobs:
+                        child, info = waiting.pop()
+                        opened.append(child)
+                        pending[pool.submit(_scan_subdirectory, child, info)] = (child, False)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        for directory in opened:
+            if directory.fd is not None:
+                os.close(directory.fd)
+                directory.fd = None
+
+    with phase("rmdir"):
+        os.rmdir(path)
+    return RemoveStats(files, dirs + 1, time.perf_counter() - start)
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+
+from src.logger import log_command, log_error, flush_file_events
+from src.parser import parse, set_prompts
+from src.registry import dispatch
+from src.stats import io_counters
+
+_opened_files = None
+_audit_installed = False
+
+
+def _audit_open(event, args):
+    """Аудит-хук: запоминает пути файлов, открытых во время замера"""
+    if _opened_files is not None and event == "open" and isinstance(args[0], (str, bytes, os.PathLike)):
+        _opened_files.add(os.fsdecode(args[0]))
+
+def run_line(line):
+    """
+    Выполнение одной строки команды; строка, оканчивающаяся на '&', запускается в фоне
+    Returns:
+        bool: True, если команда выполнена успешно (или поставлена в фон)
+    """
+    log_command(line)
+    background = line.rstrip().endswith("&")
+    if background:
+        line = line.rstrip()[:-1].rstrip()
+    try:
+        command, flags, args = parse(line)
+    except Exception as e:
+        log_error(f"Parse error: {e}")
+        print(f"Parse error: {e}")
+        return False
+    if background:
+        from src.jobs import submit_job
+        return submit_job(line, command, flags, args)
+    return dispatch(command, flags, args)
+
+def finish_jobs():
+    """
+    Ожидание фоновых задач перед выходом
+    Returns:
+        bool: True, если фоновых задач не было или все завершились успешно
+    """
+    jobs = sys.modules.get("src.jobs")
+    return jobs is None or jobs.wait_jobs()
+
+def measure_line(line):
+    """
+    Выполнение строки с замером времени, объема ввода-вывода и количества открытых файлов
+    Returns:
+        tuple: (успех, время в секундах, прочитано байт, записано байт, открыто файлов)
+    """
+    global _opened_files
+    _opened_files = set()
+    io_before = io_counters()
+    start = time.perf_counter()
+    try:
+        ok = run_line(line)
+    finally:
+        elapsed = time.perf_counter() - start
+        io_after = io_counters()
+        opened, _opened_files = _opened_files, None
+    if io_before is None or io_after is None:
+        read = written = None
+    else:
+        read, written = io_after[0] - io_before[0], io_after[1] - io_before[1]
+    return ok, elapsed, read, written, len(opened)
+
+def print_report(rows, out=sys.stderr):
+    """Вывод отчета по командам сценария"""
+    print(f"{'status':6} {'wall_s':>9} {'read_B':>12} {'written_B':>12} {'files':>6}  command", file=out)
+    for line, ok, elapsed, read, written, files in rows:
+        read = "-" if read is None else read
+        written = "-" if written is None else written
+        print(f"{'ok' if ok else 'FAIL':6} {elapsed:9.3f} {read:>12} {written:>12} {files:>6}  {line}", file=out)
+
+def run_script(lines, report=False, keep_going=False):
+    """
+    Выполнение команд без запроса ввода
+    Пустые строки и строки, начинающиеся с '#', пропускаются; 'q' завершает сценарий.
+    Запросы подтверждения отключены: команда, которой нужно подтверждение (rm -r без -f),
+    завершается ошибкой, а не читает следующую строку сценария.
+    Args:
+        lines: Строки с командами
+        report: Вывести в stderr время, объем ввода-вывода и количество файлов по каждой команде
+        keep_going: Продолжать после ошибки
+    Returns:
+        int: Код завершения: 0 - все команды успешны, 1 - была ошибка
+    """
+    global _audit_installed
+    if report and not _audit_installed:
+        sys.addaudithook(_audit_open)
+        _audit_installed = True
+    rows = []
+    prompts = set_prompts(False)
+    try:
+        failed = _run_lines(lines, report, keep_going, rows)
+    finally:
+        set_prompts(prompts)
+
+    if not finish_jobs():
+        failed = True
+    if report:
+        print_report(rows)
+    return 1 if failed else 0
+
+def _run_lines(lines, report, keep_going, rows):
+    """Выполнение строк сценария; возвращает True, если была ошибка"""
+    failed = False
+    for line in lines:
+        line = line.strip().replace("\\", "/")
+        if not line or line.startswith("#"):
+            continue
+        if line == "q":
+            log_command("q")
+            break
+
+        if report:
+            ok, *measures = measure_line(line)
+            rows.append((line, ok, *measures))
+        else:
+            ok = run_line(line)
+        flush_file_events()
+
+        if not ok:
+            failed = True
+            if not keep_going:
+                break
+    return failed
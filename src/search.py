@@ -0,0 +1,327 @@
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+import mmap
+import os
+import queue
+import re
+import threading
+import time
+
+from src.const import BINARY_CHECK_SIZE, SEARCH_QUEUE_SIZE
+from src.errors import InvalidInputError
+from src.logger import log_success, log_warning
+from src.parser import flag_value, int_flag
+from src.stats import phase
+from src.transfer import default_jobs
+
+_DONE = object()
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class ParallelWalk:
+    """
+    Обход дерева в пуле потоков с потоковой выдачей результатов
+    Результаты передаются через ограниченную очередь: если потребитель не успевает,
+    рабочие потоки ждут, поэтому память не растет с размером дерева.
+    """
+
+    def __init__(self, jobs=None):
+        self.pool = ThreadPoolExecutor(jobs or default_jobs(), thread_name_prefix="walk")
+        self.results = queue.Queue(SEARCH_QUEUE_SIZE)
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.pending = 1
+
+    def submit(self, func, *args):
+        """Постановка задачи func(*args); задача может ставить новые задачи и выдавать результаты"""
+        if self.cancelled.is_set():
+            return
+        with self.lock:
+            self.pending += 1
+        try:
+            self.pool.submit(self._run, func, args)
+        except RuntimeError:
+            self._task_done()
+
+    def emit(self, item):
+        """Выдача результата потребителю"""
+        while not self.cancelled.is_set():
+            try:
+                self.results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self, func, args):
+        try:
+            if not self.cancelled.is_set():
+                func(*args)
+        except OSError as e:
+            self.emit(e)
+        finally:
+            self._task_done()
+
+    def _task_done(self):
+        with self.lock:
+            self.pending -= 1
+            finished = self.pending == 0
+        if finished:
+            self.emit(_DONE)
+
+    def __iter__(self):
+        """Результаты по мере появления; ошибки чтения выдаются как объекты OSError"""
+        self._task_done()
+        try:
+            while True:
+                item = self.results.get()
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            self.cancelled.set()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+def parse_size(value):
+    """
+    Разбор условия размера: +10M - больше, -10M - меньше, 10M - ровно
+    Returns:
+        tuple: (знак "+", "-" или "", размер в байтах)
+    Raises:
+        InvalidInputError: Если условие задано неверно
+    """
+    match = re.fullmatch(r"([+-]?)(\d+)([KMG]?)", value or "", re.IGNORECASE)
+    if match is None:
+        raise InvalidInputError(f"Invalid value for --size: {value}")
+    sign, number, unit = match.groups()
+    return sign, int(number) * _SIZE_UNITS[unit.upper()]
+
+def parse_days(value):
+    """
+    Разбор условия времени изменения в днях: -N - менее N дней назад, +N - более N дней назад
+    Returns:
+        tuple: (знак "+", "-" или "", количество дней)
+    Raises:
+        InvalidInputError: Если условие задано неверно
+    """
+    match = re.fullmatch(r"([+-]?)(\d+)", value or "")
+    if match is None:
+        raise InvalidInputError(f"Invalid value for --mtime: {value}")
+    return match.group(1), int(match.group(2))
+
+def _compare(sign, actual, expected):
+    if sign == "+":
+        return actual > expected
+    if sign == "-":
+        return actual < expected
+    return actual == expected
+
+def make_predicate(name=None, size=None, mtime=None, kind=None):
+    """
+    Условие отбора для find
+    Args:
+        name: Шаблон имени (*, ?, [...])
+        size: Условие размера, см. parse_size
+        mtime: Условие времени изменения в днях, см. parse_days
+        kind: "f" - файлы, "d" - директории, "l" - символические ссылки
+    Returns:
+        callable: Функция от os.DirEntry -> bool
+    Raises:
+        InvalidInputError: Если условие задано неверно
+    """
+    if kind not in (None, "f", "d", "l"):
+        raise InvalidInputError(f"Invalid value for --type: {kind}")
+    size = parse_size(size) if size is not None else None
+    mtime = parse_days(mtime) if mtime is not None else None
+    now = time.time()
+
+    def predicate(entry):
+        if name is not None and not fnmatch.fnmatch(entry.name, name):
+            return False
+        if kind == "f" and not entry.is_file(follow_symlinks=False):
+            return False
+        if kind == "d" and not entry.is_dir(follow_symlinks=False):
+            return False
+        if kind == "l" and not entry.is_symlink():
+            return False
+        if size is None and mtime is None:
+            return True
+        info = entry.stat(follow_symlinks=False)
+        if size is not None and not _compare(size[0], info.st_size, size[1]):
+            return False
+        return mtime is None or _compare(mtime[0], int((now - info.st_mtime) // 86400), mtime[1])
+    return predicate
+
+def find(path=".", predicate=None, jobs=None):
+    """
+    команда find: параллельный обход дерева
+    Args:
+        path: Корень поиска
+        predicate: Условие отбора (make_predicate); по умолчанию все объекты
+        jobs: Количество потоков обхода
+    Yields:
+        str | OSError: Пути подходящих объектов по мере нахождения или ошибки чтения директорий
+    Raises:
+        FileNotFoundError: Если путь не существует
+    """
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Directory {path} does not exist")
+    predicate = predicate or (lambda entry: True)
+    walk = ParallelWalk(jobs)
+
+    def scan(directory):
+        with phase("walk"), os.scandir(directory) as entries:
+            for entry in entries:
+                if predicate(entry):
+                    walk.emit(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    walk.submit(scan, entry.path)
+
+    walk.submit(scan, path)
+    yield from walk
+
+def compile_pattern(pattern, literal=False, ignore_case=False):
+    """
+    Поисковая функция по байтовому шаблону
+    Без учета регистра и для регулярных выражений используется re (^ и $ относятся к строкам);
+    подстрока ищется через mmap.find.
+    Returns:
+        callable: (буфер, позиция) -> позиция совпадения или -1
+    Raises:
+        InvalidInputError: Если регулярное выражение некорректно
+    """
+    needle = os.fsencode(pattern)
+    if literal and not ignore_case:
+        return lambda buffer, pos: buffer.find(needle, pos)
+    try:
+        regex = re.compile(re.escape(needle) if literal else needle,
+                           re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    except re.error as e:
+        raise InvalidInputError(f"Invalid pattern {pattern}: {e}")
+
+    def search(buffer, pos):
+        match = regex.search(buffer, pos)
+        return match.start() if match else -1
+    return search
+
+def grep_file(path, search, files_only=False, count=False):
+    """
+    Поиск в одном файле через mmap без чтения файла в память
+    Файлы с нулевым байтом в первых BINARY_CHECK_SIZE байтах считаются двоичными и пропускаются.
+    Args:
+        path: Путь к файлу
+        search: Поисковая функция (compile_pattern)
+        files_only: Остановиться на первом совпадении
+        count: Только подсчитать совпавшие строки
+    Yields:
+        bytes | int: Совпавшие строки, при count - их количество, при files_only - 1 при совпадении
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            if count:
+                yield 0
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if b"\0" in buffer[:BINARY_CHECK_SIZE]:
+                return
+            matched = 0
+            pos = 0
+            while pos <= size:
+                found = search(buffer, pos)
+                if found == -1 or found >= size:
+                    break
+                end = buffer.find(b"\n", found)
+                if end == -1:
+                    end = size
+                if files_only:
+                    yield 1
+                    return
+                if count:
+                    matched += 1
+                else:
+                    yield buffer[buffer.rfind(b"\n", 0, found) + 1:end]
+                pos = end + 1
+            if count:
+                yield matched
+
+def grep(pattern, paths, recursive=False, literal=False, ignore_case=False, files_only=False, count=False,
+         jobs=None):
+    """
+    команда grep: параллельный поиск по файлам
+    Args:
+        pattern: Регулярное выражение или, при literal, подстрока
+        paths: Файлы и, при recursive, директории
+        recursive: Искать в директориях рекурсивно
+        literal: Искать подстроку, а не регулярное выражение
+        ignore_case: Без учета регистра
+        files_only: Выдавать только имена файлов с совпадениями
+        count: Выдавать количество совпавших строк в каждом файле
+        jobs: Количество потоков
+    Yields:
+        tuple | OSError: (путь, строка в байтах / количество / None для files_only) по мере нахождения или ошибки чтения
+    Raises:
+        InvalidInputError: Если регулярное выражение некорректно
+    """
+    search = compile_pattern(pattern, literal, ignore_case)
+    walk = ParallelWalk(jobs)
+
+    def search_file(path):
+        for result in grep_file(path, search, files_only, count):
+            walk.emit((path, None if files_only else result))
+
+    def scan(directory):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    walk.submit(scan, entry.path)
+                elif entry.is_file():
+                    walk.submit(search_file, entry.path)
+
+    for path in paths:
+        if not os.path.isdir(path):
+            walk.submit(search_file, path)
+        elif recursive:
+            walk.submit(scan, path)
+        else:
+            walk.emit(IsADirectoryError(21, "Is a directory", path))
+    yield from walk
+
+def _report_error(command, error):
+    print(f"{command}: {error.filename}: {error.strerror}")
+    log_warning(f"{command}: {error.filename}: {error.strerror}")
+
+def run_find(flags, args):
+    """Обработчик команды find"""
+    path = args[0] if args else "."
+    predicate = make_predicate(flag_value(flags, "--name"), flag_value(flags, "--size"),
+                               flag_value(flags, "--mtime"), flag_value(flags, "--type"))
+    found = 0
+    for result in find(path, predicate, int_flag(flags, "-j")):
+        if isinstance(result, OSError):
+            _report_error("find", result)
+            continue
+        print(result)
+        found += 1
+    log_success(f"find {path}: {found} matches")
+
+def run_grep(flags, args):
+    """Обработчик команды grep"""
+    pattern, paths = args[0], args[1:] or ["."]
+    show_path = "-r" in flags or len(paths) > 1
+    matches = 0
+    for result in grep(pattern, paths, "-r" in flags, "-F" in flags, "-i" in flags, "-l" in flags,
+                       "-c" in flags, int_flag(flags, "-j")):
+        if isinstance(result, OSError):
+            _report_error("grep", result)
+            continue
+        path, value = result
+        if "-l" in flags:
+            print(path)
+        elif "-c" in flags:
+            print(f"{path}:{value}" if show_path else value)
+        else:
+            line = value.decode("utf-8", errors="replace")
+            print(f"{path}:{line}" if show_path else line)
+        matches += 1
+    log_success(f"grep {pattern}: {matches} results")
@@ -0,0 +1,228 @@
+from collections import deque
+from dataclasses import dataclass, field
+import os
+import sys
+import threading
+import time
+
+from src.const import STATS_WINDOW
+from src.errors import InvalidInputError
+
+AUDIT_EVENTS = {
+    "open": "open",
+    "os.scandir": "scandir",
+    "os.listdir": "listdir",
+    "os.remove": "remove",
+    "os.rename": "rename",
+    "os.mkdir": "mkdir",
+    "os.rmdir": "rmdir",
+    "os.link": "link",
+    "os.utime": "utime",
+    "shutil.copyfile": "copyfile",
+}
+"""Аудит-события, которые подсчитываются при включенной инструментации"""
+
+_active = []
+_lock = threading.Lock()
+_history = {}
+_audit_installed = False
+
+
+@dataclass
+class CommandRecord:
+    """Замер одного выполнения команды"""
+    command: str
+    wall: float = 0.0
+    cpu: float = 0.0
+    read: int = 0
+    written: int = 0
+    ok: bool = True
+    phases: dict = field(default_factory=dict)
+    events: dict = field(default_factory=dict)
+    paths: set = field(default_factory=set)
+
+    @property
+    def files(self):
+        """Количество разных открытых файлов"""
+        return len(self.paths)
+
+class _Phase:
+    """Замер длительности этапа для всех выполняющихся команд"""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            for record in _active:
+                record.phases[self.name] = record.phases.get(self.name, 0.0) + elapsed
+
+class _NullPhase:
+    """Этап при выключенной инструментации: ничего не делает"""
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_PHASE = _NullPhase()
+
+def phase(name):
+    """
+    Контекстный менеджер этапа команды (walk, copy, compress, ...)
+    При выключенной инструментации возвращает общий пустой объект.
+    Одновременно выполняющиеся команды (фоновые задачи) получают время этапа все вместе.
+    """
+    if not _active:
+        return _NULL_PHASE
+    return _Phase(name)
+
+def io_counters():
+    """Прочитанные и записанные процессом байты (Linux /proc/self/io) или None"""
+    try:
+        with open("/proc/self/io") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def _audit(event, args):
+    """Аудит-хук: подсчет файловых системных вызовов выполняющихся команд"""
+    if not _active:
+        return
+    name = AUDIT_EVENTS.get(event)
+    if name is None:
+        return
+    with _lock:
+        for record in _active:
+            record.events[name] = record.events.get(name, 0) + 1
+            if event == "open" and isinstance(args[0], (str, bytes)):
+                record.paths.add(os.fsdecode(args[0]))
+
+def instrumented_call(command, handler, flags, args):
+    """
+    Выполнение обработчика с замером времени, процессорного времени, ввода-вывода,
+    открытых файлов, системных вызовов и этапов; результат попадает в историю команды
+    """
+    record = CommandRecord(command)
+    io_before = io_counters()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    with _lock:
+        _active.append(record)
+    try:
+        handler(flags, args)
+    except BaseException:
+        record.ok = False
+        raise
+    finally:
+        record.wall = time.perf_counter() - start
+        record.cpu = time.process_time() - cpu_start
+        with _lock:
+            _active.remove(record)
+        io_after = io_counters()
+        if io_before is not None and io_after is not None:
+            record.read, record.written = io_after[0] - io_before[0], io_after[1] - io_before[1]
+        _history.setdefault(command, deque(maxlen=STATS_WINDOW)).append(record)
+
+def enable_stats():
+    """Включение инструментации всех команд"""
+    global _audit_installed
+    from src.registry import set_command_hook
+    if not _audit_installed:
+        sys.addaudithook(_audit)
+        _audit_installed = True
+    set_command_hook(instrumented_call)
+
+def disable_stats():
+    """Выключение инструментации; накопленная история сохраняется"""
+    from src.registry import set_command_hook
+    set_command_hook(None)
+
+def profile_command(command, handler, flags, args, path=None):
+    """
+    Выполнение одной команды под cProfile с сохранением результата в файл pstats
+    Профилируется поток команды; потоки пулов внутри команды в профиль не попадают.
+    Returns:
+        str: Путь к файлу профиля
+    """
+    import cProfile
+    path = path or f"{command}-{time.strftime('%Y%m%d-%H%M%S')}.pstats"
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(handler, flags, args)
+    finally:
+        profiler.dump_stats(path)
+        print(f"Profile saved to {path}")
+    return path
+
+def percentile(values, p):
+    """Процентиль p (0-100) методом ближайшего ранга"""
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+def summary(command):
+    """
+    Сводка по последним STATS_WINDOW выполнениям команды
+    Returns:
+        dict: количество, ошибки, процентили времени, средние CPU, ввод-вывод, файлы, этапы и вызовы
+    """
+    records = list(_history.get(command, ()))
+    if not records:
+        return None
+    count = len(records)
+    walls = [record.wall for record in records]
+    phases = {}
+    events = {}
+    for record in records:
+        for name, seconds in record.phases.items():
+            phases[name] = phases.get(name, 0.0) + seconds / count
+        for name, calls in record.events.items():
+            events[name] = events.get(name, 0) + calls / count
+    return {
+        "count": count,
+        "failed": sum(not record.ok for record in records),
+        "p50": percentile(walls, 50),
+        "p90": percentile(walls, 90),
+        "p99": percentile(walls, 99),
+        "cpu": sum(record.cpu for record in records) / count,
+        "read": sum(record.read for record in records) // count,
+        "written": sum(record.written for record in records) // count,
+        "files": sum(record.files for record in records) // count,
+        "phases": phases,
+        "events": events,
+    }
+
+def reset_stats():
+    """Очистка истории замеров"""
+    _history.clear()
+
+def run_stats(flags, args):
+    """Обработчик команды stats: stats [on|off|reset|команда...]"""
+    if args and args[0] in ("on", "off", "reset"):
+        {"on": enable_stats, "off": disable_stats, "reset": reset_stats}[args[0]]()
+        print(f"stats {args[0]}")
+        return
+    commands = args or sorted(_history)
+    if not commands:
+        print("No statistics: enable with 'stats on'")
+        return
+    print(f"{'command':10} {'runs':>5} {'fail':>4} {'p50_s':>9} {'p90_s':>9} {'p99_s':>9} {'cpu_s':>9} "
+          f"{'read_B':>12} {'written_B':>12} {'files':>6}")
+    for command in commands:
+        data = summary(command)
+        if data is None:
+            raise InvalidInputError(f"No statistics for {command}")
+        print(f"{command:10} {data['count']:>5} {data['failed']:>4} {data['p50']:9.4f} {data['p90']:9.4f} "
+              f"{data['p99']:9.4f} {data['cpu']:9.4f} {data['read']:>12} {data['written']:>12} {data['files']:>6}")
+        details = [f"{name} {seconds:.4f}s" for name, seconds in sorted(data["phases"].items())]
+        details += [f"{name} x{calls:.0f}" for name, calls in sorted(data["events"].items())]
+        if details:
+            print(f"{'':10} {', '.join(details)}")
@@ -0,0 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import errno
+import hashlib
+import os
+import shutil
+import time
+
+from src.const import COPY_BUFFER_SIZE, KERNEL_COPY_THRESHOLD
+from src.stats import phase
+
+
+@dataclass
+class TransferStats:
+    """Статистика копирования"""
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    skipped: int = 0
+    skipped_bytes: int = 0
+    deleted: int = 0
+
+    @property
+    def throughput(self):
+        """Скорость копирования, байт/с"""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        result = (f"{self.files} files, {self.bytes} bytes in {self.seconds:.3f}s "
+                  f"({self.throughput / 1024 / 1024:.1f} MB/s)")
+        if self.skipped or self.deleted:
+            result += f", skipped {self.skipped} files ({self.skipped_bytes} bytes), deleted {self.deleted}"
+        return result
+
+def default_jobs():
+    """Количество потоков по умолчанию"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+                    errno.ETXTBSY, errno.EPERM, errno.ENOTSUP}
+"""Ошибки, при которых ядро не поддерживает копирование для данной пары файлов"""
+
+def _kernel_copy(copy_chunk, fd_in, fd_out, size):
+    """
+    Копирование через системный вызов ядра
+    Args:
+        copy_chunk: Функция копирования (fd_in, fd_out, count) -> скопировано байт
+        fd_in: Дескриптор источника
+        fd_out: Дескриптор назначения
+        size: Размер источника
+    Returns:
+        bool: False, если вызов не поддерживается и ничего не было скопировано
+    """
+    copied = 0
+    while True:
+        try:
+            sent = copy_chunk(fd_in, fd_out, min(max(size - copied, COPY_BUFFER_SIZE), 1 << 30))
+        except OSError as e:
+            if copied == 0 and e.errno in _FALLBACK_ERRNOS:
+                return False
+            raise
+        if sent == 0:
+            return True
+        copied += sent
+
+def _copy_file_range(fd_in, fd_out, count):
+    return os.copy_file_range(fd_in, fd_out, count)
+
+def _sendfile(fd_in, fd_out, count):
+    return os.sendfile(fd_out, fd_in, None, count)
+
+def _copy_buffered(fsrc, fdst, size):
+    """Копирование через переиспользуемый буфер размером не больше COPY_BUFFER_SIZE"""
+    buffer = bytearray(min(size + 1, COPY_BUFFER_SIZE))
+    view = memoryview(buffer)
+    while True:
+        read = fsrc.readinto(buffer)
+        if not read:
+            break
+        fdst.write(view[:read])
+
+KERNEL_COPY_METHODS = [(name, func) for name, func, available in (
+    ("copy_file_range", _copy_file_range, hasattr(os, "copy_file_range")),
+    ("sendfile", _sendfile, hasattr(os, "sendfile")),
+) if available]
+"""Доступные на платформе способы копирования в ядре в порядке приоритета"""
+
+def copy_content(src, dst):
+    """
+    Копирование содержимого файла с выбором способа: copy_file_range, sendfile или буфер
+    Args:
+        src: Исходный файл
+        dst: Целевой файл
+    Returns:
+        str: Название использованного способа
+    """
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if size >= KERNEL_COPY_THRESHOLD:
+            for name, method in KERNEL_COPY_METHODS:
+                if _kernel_copy(method, fsrc.fileno(), fdst.fileno(), size):
+                    return name
+        _copy_buffered(fsrc, fdst, size)
+        return "buffer"
+
+def copy_file(src, dst, follow_symlinks=True):
+    """
+    Замена shutil.copy2: содержимое по возможности копируется средствами ядра
+    Args:
+        src: Исходный файл
+        dst: Целевой файл или директория
+        follow_symlinks: Следовать ли символическим ссылкам
+    Returns:
+        str: Путь к копии
+    Raises:
+        shutil.SameFileError: Если источник и цель - один и тот же файл
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src} and {dst} are the same file")
+    if not follow_symlinks and os.path.islink(src):
+        return shutil.copy2(src, dst, follow_symlinks=False)
+    copy_content(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+def plan_tree(source, target):
+    """
+    Однократный обход дерева и создание структуры каталогов в целевом пути
+    Args:
+        source: Исходная директория
+        target: Целевая директория
+    Returns:
+        tuple: (список пар директорий, список пар файлов) вида (источник, цель)
+    """
+    dirs = []
+    files = []
+    with phase("walk"):
+        for root, _, filenames in os.walk(source, followlinks=True):
+            rel = os.path.relpath(root, source)
+            target_root = os.path.normpath(os.path.join(target, rel))
+            os.makedirs(target_root, exist_ok=True)
+            dirs.append((root, target_root))
+            for name in filenames:
+                files.append((os.path.join(root, name), os.path.join(target_root, name)))
+    return dirs, files
+
+def run_parallel(func, items, jobs=None):
+    """
+    Применение функции к элементам в пуле потоков
+    Args:
+        func: Функция от одного элемента
+        items: Элементы
+        jobs: Количество потоков; 1 - последовательное выполнение
+    Returns:
+        list: Результаты в порядке элементов
+    """
+    if jobs == 1 or len(items) < 2:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(jobs or default_jobs()) as pool:
+        return list(pool.map(func, items))
+
+def copy_tree(source, target, jobs=None):
+    """
+    Параллельное рекурсивное копирование с сохранением метаданных как у copy2
+    Args:
+        source: Исходная директория
+        target: Целевая директория
+        jobs: Количество потоков копирования
+    Returns:
+        TransferStats: Статистика копирования
+    """
+    start = time.perf_counter()
+    dirs, files = plan_tree(source, target)
+
+    def copy_one(pair):
+        with phase("copy"):
+            copy_file(*pair)
+        return os.path.getsize(pair[1])
+
+    sizes = run_parallel(copy_one, files, jobs)
+    for source_dir, target_dir in reversed(dirs):
+        shutil.copystat(source_dir, target_dir)
+
+    return TransferStats(len(sizes), sum(sizes), time.perf_counter() - start)
+
+def file_hash(path):
+    """Хэш содержимого файла"""
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "blake2b").hexdigest()
+
+def is_unchanged(source, target, checksum=False):
+    """
+    Проверка, что целевой файл совпадает с исходным
+    Args:
+        source: Исходный файл
+        target: Целевой файл
+        checksum: Сравнивать хэши содержимого вместо времени изменения
+    Returns:
+        tuple: (совпадает ли файл, размер исходного файла)
+    """
+    source_stat = os.stat(source)
+    try:
+        target_stat = os.stat(target)
+    except FileNotFoundError:
+        return False, source_stat.st_size
+    if source_stat.st_size != target_stat.st_size:
+        return False, source_stat.st_size
+    if checksum:
+        return file_hash(source) == file_hash(target), source_stat.st_size
+    return int(source_stat.st_mtime) == int(target_stat.st_mtime), source_stat.st_size
+
+def _delete_extra(source, target):
+    """Удаление из целевого дерева путей, отсутствующих в исходном; возвращает их количество"""
+    deleted = 0
+    for root, dirnames, filenames in os.walk(target):
+        source_root = os.path.join(source, os.path.relpath(root, target))
+        for name in list(dirnames):
+            if not os.path.isdir(os.path.join(source_root, name)):
+                shutil.rmtree(os.path.join(root, name))
+                dirnames.remove(name)
+                deleted += 1
+        for name in filenames:
+            if not os.path.isfile(os.path.join(source_root, name)):
+                os.remove(os.path.join(root, name))
+                deleted += 1
+    return deleted
+
+def sync_tree(source, target, jobs=None, checksum=False, delete=False):
+    """
+    Инкрементальное копирование: копируются только новые и измененные файлы
+    Args:
+        source: Исходная директория
+        target: Целевая директория (зеркало исходной)
+        jobs: Количество потоков копирования
+        checksum: Сравнивать хэши содержимого вместо (размер, время изменения)
+        delete: Удалять файлы, отсутствующие в исходной директории
+    Returns:
+        TransferStats: Статистика копирования
+    """
+    start = time.perf_counter()
+    deleted = _delete_extra(source, target) if delete and os.path.isdir(target) else 0
+    dirs, files = plan_tree(source, target)
+
+    def sync_one(pair):
+        with phase("compare"):
+            unchanged, size = is_unchanged(*pair, checksum)
+        if not unchanged:
+            with phase("copy"):
+                copy_file(*pair)
+        return unchanged, size
+
+    results = run_parallel(sync_one, files, jobs)
+    for source_dir, target_dir in reversed(dirs):
+        shutil.copystat(source_dir, target_dir)
+
+    copied = [size for unchanged, size in results if not unchanged]
+    skipped = [size for unchanged, size in results if unchanged]
+    return TransferStats(len(copied), sum(copied), time.perf_counter() - start,
+                         len(skipped), sum(skipped), deleted)
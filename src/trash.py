@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+from src.const import TRASH_DIR_NAME, TRASH_INDEX_NAME
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _index_path():
+    return Path.home() / TRASH_INDEX_NAME
+
+def _mount_point(path):
+    """Точка монтирования файловой системы, на которой находится путь"""
+    device = os.lstat(path).st_dev
+    while path.parent != path and os.lstat(path.parent).st_dev == device:
+        path = path.parent
+    return path
+
+def trash_dirs():
+    """Зарегистрированные корзины"""
+    try:
+        return [Path(line) for line in _index_path().read_text(encoding="utf-8").splitlines() if line]
+    except OSError:
+        return []
+
+def _register(trash):
+    """Добавление корзины в индекс"""
+    if trash not in trash_dirs():
+        with open(_index_path(), "a", encoding="utf-8") as index:
+            index.write(f"{trash}\n")
+
+def trash_dir_for(path):
+    """
+    Корзина на той же файловой системе, что и путь
+    Проверяются домашняя директория, корень точки монтирования и родительская директория.
+    Raises:
+        OSError: Если подходящую корзину создать нельзя
+    """
+    device = os.lstat(path).st_dev
+    for base in (Path.home(), _mount_point(path), path.parent):
+        trash = base / TRASH_DIR_NAME
+        try:
+            if os.lstat(base).st_dev != device:
+                continue
+            trash.mkdir(exist_ok=True)
+            return trash
+        except OSError:
+            continue
+    raise OSError(f"No trash directory available for {path}")
+
+def defer_remove(path, purge=True):
+    """
+    Мгновенное удаление переименованием в корзину на той же файловой системе
+    Корзина регистрируется в индексе в домашней директории, поэтому очистка
+    продолжается после перезапуска оболочки (см. resume_purge).
+    Args:
+        path: Удаляемый путь
+        purge: Запустить фоновую очистку корзины
+    Returns:
+        Path: Путь объекта в корзине
+    """
+    path = Path(path)
+    trash = trash_dir_for(path)
+    target = trash / f"{time.time_ns()}-{os.getpid()}-{path.name}"
+    os.rename(path, target)
+    _register(trash)
+    if purge:
+        start_purger()
+    return target
+
+def start_purger():
+    """Запуск процесса очистки корзин с низким приоритетом процессора и диска"""
+    import shutil
+    import subprocess
+    command = [sys.executable, "-m", "src.trash"]
+    ionice = shutil.which("ionice")
+    if ionice:
+        command = [ionice, "-c3"] + command
+    subprocess.Popen(command, cwd=Path(__file__).resolve().parent.parent, start_new_session=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def resume_purge():
+    """Продолжение очистки, не завершенной в прошлом сеансе"""
+    if any(trash.is_dir() and any(trash.iterdir()) for trash in trash_dirs()):
+        start_purger()
+
+def purge_trash():
+    """
+    Очистка всех корзин до тех пор, пока в них не перестанут появляться объекты
+    Returns:
+        int: Количество удаленных объектов корзины
+    """
+    from src.remove import remove_tree
+    purged = 0
+    while True:
+        entries = [entry for trash in trash_dirs() if trash.is_dir() for entry in trash.iterdir()]
+        if not entries:
+            return purged
+        for entry in entries:
+            if entry.is_dir() and not entry.is_symlink():
+                remove_tree(entry, jobs=1)
+            else:
+                entry.unlink()
+            purged += 1
+
+def main():
+    if hasattr(os, "nice"):
+        os.nice(19)
+    with open(_index_path(), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        purge_trash()
+
+
+if __name__ == "__main__":
+    main()
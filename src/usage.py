@@ -0,0 +1,215 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+
+from src.const import DU_CACHE_NAME, MTIME_SETTLE_NS
+from src.logger import log_success, log_warning
+from src.parser import int_flag
+from src.stats import phase
+from src.transfer import default_jobs
+
+
+
+@dataclass
+class DirUsage:
+    """Содержимое одной директории без учета поддиректорий"""
+    mtime_ns: int
+    bytes: int = 0
+    files: int = 0
+    links: list = field(default_factory=list)
+    subdirs: list = field(default_factory=list)
+
+def _entry_size(info, apparent):
+    """Размер объекта: занятые блоки или, при apparent, длина файла"""
+    if apparent or not hasattr(info, "st_blocks"):
+        return info.st_size
+    return info.st_blocks * 512
+
+def _scan_directory(path, info, apparent):
+    """
+    Чтение одной директории через os.scandir
+    Файлы с несколькими жесткими ссылками не суммируются, а запоминаются по (st_dev, st_ino).
+    Args:
+        path: Путь к директории
+        info: Результат lstat директории
+        apparent: Считать длину файлов вместо занятых блоков
+    Returns:
+        DirUsage: Содержимое директории
+    """
+    usage = DirUsage(info.st_mtime_ns, _entry_size(info, apparent))
+    with phase("walk"), os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                usage.subdirs.append(entry.name)
+                continue
+            entry_info = entry.stat(follow_symlinks=False)
+            size = _entry_size(entry_info, apparent)
+            if entry_info.st_nlink > 1:
+                usage.links.append((entry_info.st_dev, entry_info.st_ino, size))
+            else:
+                usage.bytes += size
+                usage.files += 1
+    return usage
+
+def scan_usage(root, jobs=None, apparent=False, cache=None):
+    """
+    Параллельный обход дерева в пуле потоков
+    Директория, mtime которой совпадает с записью кэша, не читается заново;
+    ее поддиректории все равно проверяются, так как их изменения не меняют mtime родителя.
+    Args:
+        root: Корень обхода
+        jobs: Количество потоков
+        apparent: Считать длину файлов вместо занятых блоков
+        cache: Кэш путь -> DirUsage от прошлого обхода
+    Returns:
+        tuple: (словарь путь -> DirUsage, список ошибок чтения)
+    """
+    cache = cache or {}
+    usage = {}
+    errors = []
+
+    def visit(path):
+        info = os.lstat(path)
+        cached = cache.get(path)
+        if cached is not None and cached.mtime_ns == info.st_mtime_ns:
+            return cached
+        return _scan_directory(path, info, apparent)
+
+    with ThreadPoolExecutor(jobs or default_jobs()) as pool:
+        pending = {pool.submit(visit, root): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    result = future.result()
+                except OSError as e:
+                    errors.append(e)
+                    continue
+                usage[path] = result
+                for name in result.subdirs:
+                    subdir = os.path.join(path, name)
+                    pending[pool.submit(visit, subdir)] = subdir
+    return usage, errors
+
+def subtree_totals(usage, root):
+    """
+    Суммирование размеров поддеревьев
+    Каждый inode с несколькими жесткими ссылками учитывается один раз - в первой по порядку директории.
+    Args:
+        usage: Результат scan_usage
+        root: Корень обхода
+    Returns:
+        dict: путь -> [байт, файлов] с учетом всех вложенных директорий
+    """
+    seen = set()
+    totals = {}
+    for path in sorted(usage):
+        entry = usage[path]
+        size, files = entry.bytes, entry.files
+        for dev, ino, link_size in entry.links:
+            if (dev, ino) not in seen:
+                seen.add((dev, ino))
+                size += link_size
+                files += 1
+        totals[path] = [size, files]
+    for path in sorted(totals, key=lambda p: p.count(os.sep), reverse=True):
+        parent = totals.get(os.path.dirname(path))
+        if path != root and parent is not None:
+            parent[0] += totals[path][0]
+            parent[1] += totals[path][1]
+    return totals
+
+def _cache_path():
+    return Path.home() / DU_CACHE_NAME
+
+def _cache_mode(apparent):
+    return "apparent" if apparent else "blocks"
+
+def load_cache(apparent=False):
+    """Загрузка кэша размеров директорий; поврежденный или отсутствующий кэш пуст"""
+    try:
+        data = json.loads(_cache_path().read_text(encoding="utf-8"))[_cache_mode(apparent)]
+        return {path: DirUsage(*values) for path, values in data.items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+def save_cache(usage, root, apparent=False):
+    """
+    Сохранение результатов обхода в кэш
+    Записи удаленных директорий внутри root отбрасываются.
+    """
+    try:
+        data = json.loads(_cache_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    prefix = root.rstrip(os.sep) + os.sep
+    entries = {path: values for path, values in data.get(_cache_mode(apparent), {}).items()
+               if path != root and not path.startswith(prefix)}
+    fresh_before = time.time_ns() - MTIME_SETTLE_NS
+    for path, entry in usage.items():
+        if entry.mtime_ns < fresh_before:
+            entries[path] = [entry.mtime_ns, entry.bytes, entry.files, entry.links, entry.subdirs]
+    data[_cache_mode(apparent)] = entries
+    tmp = _cache_path().with_name(f"{DU_CACHE_NAME}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, _cache_path())
+
+def human_size(size):
+    """Размер в читаемом виде: 1.5K, 20M"""
+    for unit in "BKMGT":
+        if size < 1024 or unit == "T":
+            return f"{size}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+def du(path=".", max_depth=None, summarize=False, limit=None, apparent=False, jobs=None, cache=False):
+    """
+    команда du
+    Args:
+        path: Путь к директории или файлу
+        max_depth: Максимальная глубина выводимых директорий
+        summarize: Вывести только итог по path
+        limit: Вывести limit самых больших директорий
+        apparent: Считать длину файлов вместо занятых блоков
+        jobs: Количество потоков обхода
+        cache: Использовать и обновлять кэш размеров директорий
+    Returns:
+        list: Строки (байт, путь): по имени или, при limit, по убыванию размера
+    Raises:
+        FileNotFoundError: Если путь не существует
+    """
+    root = os.path.abspath(path)
+    if not os.path.lexists(root):
+        raise FileNotFoundError(f"Path {root} does not exist")
+    if not os.path.isdir(root) or os.path.islink(root):
+        return [(_entry_size(os.lstat(root), apparent), root)]
+
+    usage, errors = scan_usage(root, jobs, apparent, load_cache(apparent) if cache else None)
+    for error in errors:
+        print(f"du: cannot read {error.filename}: {error.strerror}")
+        log_warning(f"du: cannot read {error.filename}: {error.strerror}")
+    if cache:
+        save_cache(usage, root, apparent)
+
+    totals = subtree_totals(usage, root)
+    if summarize:
+        max_depth = 0
+    base_depth = root.rstrip(os.sep).count(os.sep)
+    rows = [(size, directory) for directory, (size, _) in totals.items()
+            if max_depth is None or directory.rstrip(os.sep).count(os.sep) - base_depth <= max_depth]
+    if limit is not None:
+        return heapq.nlargest(limit, rows)
+    return sorted(rows, key=lambda row: row[1])
+
+def run_du(flags, args):
+    """Обработчик команды du"""
+    path = args[0] if args else "."
+    rows = du(path, int_flag(flags, "--max-depth", minimum=0), "-s" in flags, int_flag(flags, "--top"),
+              "--apparent-size" in flags, int_flag(flags, "-j"), "--cache" in flags)
+    for size, directory in rows:
+        print(f"{human_size(size) if '-h' in flags else size}\t{directory}")
+    log_success(f"du {path}: {len(rows)} items")
@@ -0,0 +1,458 @@
+from bisect import bisect_right, insort
+from collections import OrderedDict, namedtuple
+import io
+import os
+import stat
+import threading
+from pathlib import Path
+
+from src.const import ARCHIVE_SUFFIXES, CHUNK_SIZE, VFS_CACHE_DIR, VFS_CACHE_SIZE, VFS_CHECKPOINT_SPACING
+
+_DIR_MODE = stat.S_IFDIR | 0o755
+_FILE_MODE = stat.S_IFREG | 0o644
+
+_cwd = None
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class ArchivePath(namedtuple("ArchivePath", "archive inner")):
+    """Путь внутри архива: файл архива и путь элемента через '/' ("" - корень архива)"""
+    __slots__ = ()
+
+    def __str__(self):
+        return os.path.join(self.archive, *self.inner.split("/")) if self.inner else self.archive
+
+VirtualEntry = namedtuple("VirtualEntry", "name mode size mtime offset link", defaults=(0, None))
+"""Элемент архива в виде записи каталога: offset - смещение данных в tar, link - цель жесткой ссылки"""
+
+def _looks_like_archive(path):
+    """Есть ли в пути компонент с расширением архива (без обращения к диску)"""
+    return any(part.lower().endswith(ARCHIVE_SUFFIXES) for part in path.replace("\\", "/").split("/"))
+
+def member_name(name):
+    """Имя элемента архива без '.', '..', пустых компонентов и обратных слэшей"""
+    return "/".join(part for part in name.replace("\\", "/").split("/") if part not in ("", ".", ".."))
+
+def absolute_path(path):
+    """Абсолютный путь с учетом виртуальной текущей директории"""
+    path = os.path.expanduser(os.fspath(path))
+    if _cwd is not None and not os.path.isabs(path):
+        return os.path.normpath(os.path.join(str(_cwd), path))
+    return os.path.abspath(path)
+
+def resolve(path):
+    """
+    Определение, ведет ли путь внутрь архива
+    Обычные пути вне архива проверяются только по строке, без обращения к диску.
+    Args:
+        path: Путь
+    Returns:
+        ArchivePath | str: Путь внутри архива или путь файловой системы
+            (абсолютный, если текущая директория находится в архиве)
+    """
+    path = os.fspath(path)
+    if _cwd is None and not _looks_like_archive(path):
+        return path
+    absolute = absolute_path(path)
+    parts = absolute.split(os.sep)
+    for i in range(1, len(parts) + 1):
+        if parts[i - 1].lower().endswith(ARCHIVE_SUFFIXES):
+            prefix = os.sep.join(parts[:i]) or os.sep
+            if os.path.isfile(prefix):
+                return ArchivePath(prefix, "/".join(part for part in parts[i:] if part))
+    return absolute if _cwd is not None else path
+
+def in_archive():
+    """Находится ли текущая директория внутри архива"""
+    return _cwd is not None
+
+def check_real_paths(paths):
+    """
+    Проверка путей команды, которая работает только с файловой системой (cp, mv, rm)
+    Внутри архива реальная текущая директория - директория файла архива, поэтому
+    относительный путь указывал бы не туда, куда показывает приглашение.
+    Raises:
+        InvalidInputError: Если путь относительный, а текущая директория в архиве,
+            или путь ведет внутрь архива
+    """
+    from src.errors import InvalidInputError
+    for path in paths:
+        path = os.fspath(path)
+        if _cwd is not None and not os.path.isabs(os.path.expanduser(path)):
+            raise InvalidInputError(f"Relative path {path} inside archive {_cwd.archive}: "
+                                    f"use an absolute path or cd out of the archive")
+        target = resolve(path)
+        if isinstance(target, ArchivePath) and target.inner:
+            raise InvalidInputError(f"{target} is inside an archive: archives are read-only")
+
+def getcwd():
+    """Текущая директория: путь внутри архива или os.getcwd()"""
+    return str(_cwd) if _cwd is not None else os.getcwd()
+
+def chdir(target):
+    """
+    Смена виртуальной текущей директории
+    Внутри архива реальной текущей директорией становится директория файла архива.
+    Args:
+        target: ArchivePath или None для выхода из архива
+    Raises:
+        NotADirectoryError: Если путь внутри архива не является директорией
+    """
+    global _cwd
+    if target is not None:
+        entry = get_index(target.archive).entry(target.inner)
+        if not stat.S_ISDIR(entry.mode):
+            raise NotADirectoryError(f"Directory {target} is not a directory")
+        os.chdir(os.path.dirname(target.archive))
+    _cwd = target
+
+class _ChunkReader(io.RawIOBase):
+    """Бинарный поток поверх генератора блоков байт"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            self.pending = next(self.chunks, b"")
+            if not self.pending:
+                return 0
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        self.chunks.close()
+        super().close()
+
+class ArchiveIndex:
+    """Дерево элементов архива"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {"": VirtualEntry("", _DIR_MODE, 0, os.path.getmtime(path))}
+        self.children = {"": set()}
+
+    def _add(self, inner, entry):
+        """Добавление элемента и недостающих родительских директорий"""
+        inner = member_name(inner)
+        if not inner:
+            return
+        parent, _, name = inner.rpartition("/")
+        if parent not in self.entries:
+            self._add(parent, VirtualEntry(parent.rpartition("/")[2], _DIR_MODE, 0, entry.mtime))
+        self.children.setdefault(parent, set()).add(name)
+        self.entries[inner] = entry._replace(name=name)
+        if stat.S_ISDIR(entry.mode):
+            self.children.setdefault(inner, set())
+
+    def entry(self, inner):
+        """
+        Элемент по пути
+        Raises:
+            FileNotFoundError: Если элемента нет в архиве
+        """
+        entry = self.entries.get(inner)
+        if entry is None:
+            raise FileNotFoundError(f"{os.path.join(self.path, inner)} does not exist")
+        return entry
+
+    def scan(self, inner):
+        """
+        Элементы директории архива
+        Yields:
+            tuple: (name, mode, size, mtime), как commands._scan_directory
+        Raises:
+            NotADirectoryError: Если путь не является директорией
+        """
+        if not stat.S_ISDIR(self.entry(inner).mode):
+            raise NotADirectoryError(f"{os.path.join(self.path, inner)} is not a directory")
+        for name in sorted(self.children[inner]):
+            entry = self.entries[f"{inner}/{name}" if inner else name]
+            yield entry.name, entry.mode, entry.size, entry.mtime
+
+    def files(self):
+        """Пути обычных файлов и жестких ссылок в порядке архива"""
+        return [inner for inner, entry in self.entries.items() if inner and stat.S_ISREG(entry.mode)]
+
+    def open(self, inner):
+        """
+        Поток чтения содержимого элемента
+        Raises:
+            IsADirectoryError: Если элемент является директорией
+        """
+        entry = self.entry(inner)
+        if stat.S_ISDIR(entry.mode):
+            raise IsADirectoryError(f"Directory {os.path.join(self.path, inner)} is a directory")
+        if entry.link is not None and entry.link in self.entries:
+            return self.open(entry.link)
+        if not stat.S_ISREG(entry.mode):
+            raise OSError(f"{os.path.join(self.path, inner)} is not a regular file")
+        return self._open_member(inner, entry)
+
+    def close(self):
+        pass
+
+class ZipIndex(ArchiveIndex):
+    """Индекс zip архива по центральному каталогу; элементы читаются произвольным доступом"""
+
+    def __init__(self, path):
+        import zipfile
+        from datetime import datetime
+        super().__init__(path)
+        self.zip_file = zipfile.ZipFile(path)
+        self.members = {}
+        for info in self.zip_file.infolist():
+            mode = info.external_attr >> 16
+            if info.is_dir():
+                mode = _DIR_MODE
+            elif not stat.S_IFMT(mode):
+                mode = _FILE_MODE
+            mtime = datetime(*info.date_time).timestamp()
+            self._add(info.filename, VirtualEntry("", mode, info.file_size, mtime))
+            self.members[member_name(info.filename)] = info
+
+    def _open_member(self, inner, entry):
+        return self.zip_file.open(self.members[inner])
+
+    def close(self):
+        self.zip_file.close()
+
+_DECOMPRESSORS = {
+    b"\x1f\x8b": "gz",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+"""Сигнатуры сжатых потоков"""
+
+def _new_decompressor(kind):
+    if kind == "gz":
+        import zlib
+        return zlib.decompressobj(31)
+    if kind == "bz2":
+        import bz2
+        return bz2.BZ2Decompressor()
+    import lzma
+    return lzma.LZMADecompressor()
+
+def _compression(path):
+    """Алгоритм сжатия файла по сигнатуре или None"""
+    with open(path, "rb") as file:
+        head = file.read(6)
+    for magic, kind in _DECOMPRESSORS.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+class TarIndex(ArchiveIndex):
+    """
+    Индекс tar архива: смещения данных элементов и точки восстановления распаковки
+    Для сжатого архива точки восстановления - границы сжатых потоков (их создает
+    параллельный tar оболочки, pigz и т.п.) и, для gzip, снимки состояния распаковщика
+    через каждые VFS_CHECKPOINT_SPACING байт. Чтение элемента начинается с ближайшей
+    точки, а не с начала архива. Границы потоков и список элементов сохраняются на диск.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.kind = _compression(path)
+        self.checkpoints = [(0, 0, None)]
+        self.lock = threading.Lock()
+        if not self._load():
+            self._build()
+            self._save()
+
+    def _cache_path(self):
+        import hashlib
+        info = os.stat(self.path)
+        key = f"{os.path.abspath(self.path)}:{info.st_size}:{info.st_mtime_ns}"
+        return Path.home() / VFS_CACHE_DIR / (hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _load(self):
+        import json
+        try:
+            data = json.loads(self._cache_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        try:
+            for inner, *values in data["members"]:
+                self._add(inner, VirtualEntry("", *values))
+            self.checkpoints = [(upos, coffset, None) for upos, coffset in data["checkpoints"]]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            self.entries = {"": self.entries[""]}
+            self.children = {"": set()}
+            self.checkpoints = [(0, 0, None)]
+            return False
+        return True
+
+    def _save(self):
+        import json
+        members = [[inner, entry.mode, entry.size, entry.mtime, entry.offset, entry.link]
+                   for inner, entry in self.entries.items() if inner]
+        checkpoints = [[upos, coffset] for upos, coffset, state in self.checkpoints if state is None]
+        try:
+            path = self._cache_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"members": members, "checkpoints": checkpoints}), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _build(self):
+        """Однократный проход по архиву с записью элементов и точек восстановления"""
+        import tarfile
+        if self.kind is None:
+            tar = tarfile.open(self.path, "r:")
+        else:
+            tar = tarfile.open(fileobj=io.BufferedReader(_ChunkReader(self._inflate(self.checkpoints[0]))), mode="r|")
+        with tar:
+            for member in tar:
+                if member.isdir():
+                    mode = stat.S_IFDIR | member.mode
+                elif member.issym():
+                    mode = stat.S_IFLNK | member.mode
+                else:
+                    mode = stat.S_IFREG | member.mode
+                link = None
+                if member.islnk():
+                    link = member_name(member.linkname)
+                self._add(member.name, VirtualEntry("", mode, member.size, member.mtime, member.offset_data, link))
+
+    def _add_checkpoint(self, upos, coffset, state):
+        with self.lock:
+            index = bisect_right(self.checkpoints, upos, key=lambda point: point[0])
+            if self.checkpoints[index - 1][0] != upos:
+                insort(self.checkpoints, (upos, coffset, state), key=lambda point: point[0])
+
+    def _inflate(self, checkpoint):
+        """
+        Распаковка с точки восстановления с записью новых точек
+        Yields:
+            bytes: Распакованные блоки, начиная со смещения точки
+        """
+        upos, coffset, state = checkpoint
+        decompressor = state.copy() if state is not None else _new_decompressor(self.kind)
+        magic = next(magic for magic, kind in _DECOMPRESSORS.items() if kind == self.kind)
+        last = upos
+        with open(self.path, "rb") as raw:
+            raw.seek(coffset)
+            pending = b""
+            while True:
+                if not pending:
+                    pending = raw.read(CHUNK_SIZE)
+                    coffset += len(pending)
+                    if not pending:
+                        return
+                data = decompressor.decompress(pending)
+                pending = b""
+                if data:
+                    yield data
+                    upos += len(data)
+                if decompressor.eof:
+                    pending = decompressor.unused_data
+                    while len(pending) < len(magic):
+                        chunk = raw.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        coffset += len(chunk)
+                        pending += chunk
+                    if not pending.startswith(magic):
+                        return
+                    self._add_checkpoint(upos, coffset - len(pending), None)
+                    decompressor = _new_decompressor(self.kind)
+                    last = upos
+                elif self.kind == "gz" and upos - last >= VFS_CHECKPOINT_SPACING:
+                    self._add_checkpoint(upos, coffset, decompressor.copy())
+                    last = upos
+
+    def _range(self, offset, size):
+        """Блоки распакованных данных [offset, offset + size)"""
+        if self.kind is None:
+            with open(self.path, "rb") as raw:
+                raw.seek(offset)
+                while size > 0:
+                    chunk = raw.read(min(size, CHUNK_SIZE))
+                    if not chunk:
+                        return
+                    size -= len(chunk)
+                    yield chunk
+            return
+
+        with self.lock:
+            index = bisect_right(self.checkpoints, offset, key=lambda point: point[0])
+            checkpoint = self.checkpoints[index - 1]
+        position = checkpoint[0]
+        chunks = self._inflate(checkpoint)
+        try:
+            for chunk in chunks:
+                start = max(offset - position, 0)
+                position += len(chunk)
+                if position <= offset:
+                    continue
+                chunk = chunk[start:start + size]
+                size -= len(chunk)
+                yield chunk
+                if size <= 0:
+                    return
+        finally:
+            chunks.close()
+
+    def _open_member(self, inner, entry):
+        return io.BufferedReader(_ChunkReader(self._range(entry.offset, entry.size)), CHUNK_SIZE)
+
+def get_index(archive):
+    """
+    Индекс архива из кэша; индекс строится заново при изменении размера или mtime файла
+    Raises:
+        InvalidArchiveError: Если файл не является zip или tar архивом
+    """
+    from src.errors import InvalidArchiveError
+    info = os.stat(archive)
+    key = (info.st_size, info.st_mtime_ns)
+    with _indexes_lock:
+        cached = _indexes.get(archive)
+        if cached is not None and cached[0] == key:
+            _indexes.move_to_end(archive)
+            return cached[1]
+
+    import zipfile
+    from src.archive import TAR_STREAM_ERRORS
+    try:
+        if zipfile.is_zipfile(archive):
+            index = ZipIndex(archive)
+        else:
+            index = TarIndex(archive)
+    except TAR_STREAM_ERRORS + (zipfile.BadZipFile,) as e:
+        raise InvalidArchiveError(f"{archive} is not a zip or tar archive: {e}")
+
+    with _indexes_lock:
+        _indexes[archive] = (key, index)
+        _indexes.move_to_end(archive)
+        while len(_indexes) > VFS_CACHE_SIZE:
+            _indexes.popitem(last=False)[1][1].close()
+    return index
+
+def clear_cache():
+    """Закрытие и удаление всех индексов из кэша в памяти"""
+    with _indexes_lock:
+        while _indexes:
+            _indexes.popitem()[1][1].close()
+
+def scan(target):
+    """Элементы директории архива: (name, mode, size, mtime)"""
+    return get_index(target.archive).scan(target.inner)
+
+def listdir(target):
+    """Имена элементов директории архива"""
+    return [row[0] for row in scan(target)]
+
+def open_member(target):
+    """Бинарный поток содержимого элемента архива"""
+    return get_index(target.archive).open(target.inner)
@@ -1,15 +1,35 @@
+import gzip
+import io
+import logging
+import logging.handlers
+import queue
+import shutil
+import threading
 import tarfile
 import zipfile
 
-from src.logger import setup_logging, log_success, log_error, log_command, log_warning
+from src.logger import (setup_logging, log_success, log_error, log_command, log_warning, log_file_event,
+                        flush_file_events, BatchingFileHandler, BatchingQueueListener)
 import pytest
-from src.errors import InvalidInputError
+from src.errors import ArchiveError, InvalidArchiveError, InvalidInputError
 import os
+from pathlib import Path
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.commands import ls, ls_l, cd, cat, cp, mv, rm, create_zip, extract_zip, create_tar, extract_tar
+from src.transfer import copy_content, copy_file
+from src.trash import purge_trash, trash_dirs
+from src.remove import _open_directory, _DIR_FLAGS, remove_tree
+from src.parser import parse
+from src.usage import du
+from src.dedup import dedup
+from src.search import find, grep, make_predicate
+from src import vfs
+from src.archive import MemberSelection, spool_size
+from src.const import SPOOL_MAX_SIZE, SPOOL_MEMORY_LIMIT, TAR_INCREMENTAL_MEMBER
+from src.archive_commands import print_members
+from src.commands import ls, ls_l, iter_ls_l, cd, cat, cat_stream, cp, mv, rm, cp_many, mv_many, rm_many, create_zip, extract_zip, create_tar, extract_tar
 
 
 
@@ -55,6 +75,26 @@ class TestCommands:
         with pytest.raises(FileNotFoundError):
             ls_l("/nonexistent",)
 
+    def test_iter_ls_l_unsorted(self, fs):
+        """Тест потокового ls -l без сортировки"""
+        fs.create_file("/dir/b.txt", contents="b")
+        fs.create_file("/dir/a.txt", contents="a")
+
+        result = list(iter_ls_l("/dir", None))
+
+        assert len(result) == 2
+        assert sorted(line.split()[-1] for line in result) == ["a.txt", "b.txt"]
+
+    def test_iter_ls_l_top_size(self, fs):
+        """Тест ls -l -S с ограничением количества строк"""
+        fs.create_file("/dir/small.txt", contents="1")
+        fs.create_file("/dir/big.txt", contents="1" * 100)
+        fs.create_file("/dir/medium.txt", contents="1" * 10)
+
+        result = list(iter_ls_l("/dir", "size", 2))
+
+        assert [line.split()[-1] for line in result] == ["big.txt", "medium.txt"]
+
     def test_cd(self, fs):
         """Тест команды cd"""
         fs .create_dir("/subdir")
@@ -103,6 +143,17 @@ class TestCommands:
         result = cat("/file1.txt")
         assert result == content
 
+    def test_cat_stream_binary(self, fs):
+        """Тест потокового cat для бинарного файла"""
+        content = bytes(range(256)) * 10
+        fs.create_file("/file.bin", contents=content)
+        out = io.BytesIO()
+
+        size = cat_stream("/file.bin", out, chunk_size=100)
+
+        assert size == len(content)
+        assert out.getvalue() == content
+
     def test_cat_does_not_exist(self, fs):
         """Тест чтения не существющего файла"""
         with pytest.raises(FileNotFoundError):
@@ -132,6 +183,17 @@ class TestCommands:
         with pytest.raises(IsADirectoryError):
             cp("/test_dir", "/test2_dir", [])
 
+    def test_cp_same_file(self, fs):
+        """Тест копирования файла в его собственную директорию: файл не должен обнуляться"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+
+        with pytest.raises(shutil.SameFileError):
+            cp("/test_dir/file1.txt", "/test_dir/", [])
+        with pytest.raises(shutil.SameFileError):
+            copy_file("/test_dir/file1.txt", "/test_dir")
+
+        assert open("/test_dir/file1.txt").read() == "content1"
+
     def test_cp_with_r(self, fs):
         """тест команды cp с флагом -r"""
         fs.create_dir("/test1_dir")
@@ -148,6 +210,57 @@ class TestCommands:
         assert open("/test11_dir/file1.txt").read() == "content1"
         assert open("/test11_dir/subdir/file2.txt").read() == "content2"
 
+    def test_cp_with_r_parallel(self, fs):
+        """тест команды cp -r в несколько потоков"""
+        for i in range(10):
+            fs.create_file(f"/src_dir/sub{i % 3}/file{i}.txt", contents=f"content{i}")
+
+        stats = cp("/src_dir", "/dst_dir", ["-r", "-j=4"])
+
+        assert stats.files == 10
+        for i in range(10):
+            assert open(f"/dst_dir/sub{i % 3}/file{i}.txt").read() == f"content{i}"
+        assert os.stat("/dst_dir/sub0/file0.txt").st_mtime == os.stat("/src_dir/sub0/file0.txt").st_mtime
+
+    def test_cp_sync(self, fs):
+        """тест команды cp -r --sync"""
+        fs.create_file("/src_dir/same.txt", contents="same")
+        fs.create_file("/src_dir/sub/changed.txt", contents="new content")
+        fs.create_file("/backup/sibling.txt", contents="sibling")
+        cp("/src_dir", "/backup", ["-r"])
+        fs.create_file("/backup/src_dir/extra.txt", contents="extra")
+        with open("/src_dir/sub/changed.txt", "w") as file:
+            file.write("changed content!")
+
+        stats = cp("/src_dir", "/backup", ["-r", "--sync", "--delete"])
+
+        assert stats.files == 1
+        assert stats.skipped == 1
+        assert stats.deleted == 1
+        assert open("/backup/src_dir/sub/changed.txt").read() == "changed content!"
+        assert not os.path.exists("/backup/src_dir/extra.txt")
+        assert open("/backup/sibling.txt").read() == "sibling"
+
+    def test_cp_into_itself(self, fs):
+        """Тест копирования директории в ее собственную поддиректорию"""
+        fs.create_file("/src_dir/sub/file.txt")
+
+        for flags in (["-r"], ["-r", "--sync"]):
+            with pytest.raises(ValueError):
+                cp("/src_dir", "/src_dir/sub", flags)
+        assert os.listdir("/src_dir/sub") == ["file.txt"]
+
+    def test_copy_content_kernel(self, tmp_path):
+        """Тест копирования большого файла средствами ядра на реальном диске"""
+        src = tmp_path / "big.bin"
+        content = os.urandom(3 * 1024 * 1024)
+        src.write_bytes(content)
+
+        method = copy_content(src, tmp_path / "copy.bin")
+
+        assert method in ("copy_file_range", "sendfile", "buffer")
+        assert (tmp_path / "copy.bin").read_bytes() == content
+
     def test_cp_file_not_found(self, fs):
         """Тест cp с несуществующим файлом"""
         with pytest.raises(FileNotFoundError):
@@ -216,6 +329,18 @@ class TestCommands:
 
         assert not os.path.exists("/test_dir")
 
+    def test_rm_with_r_force(self, fs, monkeypatch):
+        """Тест команды rm -r -f без подтверждения"""
+        for i in range(30):
+            fs.create_file(f"/test_dir/sub{i % 3}/deep{i % 2}/file{i}.txt", contents="content")
+        monkeypatch.setattr("builtins.input", lambda x: pytest.fail("confirmation requested"))
+
+        stats = rm("/test_dir", ["-f", "-r", "-j=4"])
+
+        assert not os.path.exists("/test_dir")
+        assert stats.files == 30
+        assert stats.dirs == 10
+
     def test_rm_with_r_cancel(self, fs, monkeypatch):
         """Тест rm -r с отменой"""
         fs.create_dir("/test_dir")
@@ -232,6 +357,187 @@ class TestCommands:
         with pytest.raises(InvalidInputError):
             rm("/test_dir", ["-r"])
 
+    def test_rm_defer(self, fs, monkeypatch):
+        """Тест rm -r --defer: перенос в корзину и последующая очистка"""
+        fs.create_dir(str(Path.home()))
+        fs.create_file("/data/test_dir/sub/file1.txt", contents="content1")
+        monkeypatch.setattr("src.trash.start_purger", lambda: None)
+
+        target = rm("/data/test_dir", ["-r", "-f", "--defer"])
+
+        assert not os.path.exists("/data/test_dir")
+        assert (target / "sub" / "file1.txt").read_text() == "content1"
+        assert target.parent in trash_dirs()
+
+        assert purge_trash() == 1
+        assert not target.exists()
+
+    def test_cp_mv_many(self, fs):
+        """Тест cp и mv с несколькими источниками"""
+        fs.create_file("/a.txt", contents="a")
+        fs.create_file("/b.txt", contents="bb")
+        fs.create_file("/tree/c.txt", contents="c")
+        fs.create_dir("/dst")
+        fs.create_dir("/moved")
+
+        stats = cp_many(["/a.txt", "/b.txt", "/tree"], "/dst", ["-r"])
+
+        assert stats.files == 3
+        assert stats.bytes == 4
+        assert open("/dst/tree/c.txt").read() == "c"
+
+        assert mv_many(["/a.txt", "/b.txt"], "/moved", []) == 2
+        assert sorted(os.listdir("/moved")) == ["a.txt", "b.txt"]
+        assert not os.path.exists("/a.txt")
+
+        with pytest.raises(NotADirectoryError):
+            cp_many(["/dst/a.txt", "/dst/b.txt"], "/moved/a.txt", [])
+        with pytest.raises(IsADirectoryError):
+            cp_many(["/tree", "/moved/a.txt"], "/dst", [])
+        with pytest.raises(ValueError, match="into itself"):
+            cp_many(["/moved", "/tree"], "/tree", ["-r"])
+        assert sorted(os.listdir("/tree")) == ["c.txt"]
+
+    def test_rm_many(self, fs, monkeypatch):
+        """Тест rm с несколькими путями из шаблона"""
+        for i in range(20):
+            fs.create_file(f"/work/sub{i % 4}/file{i}.tmp", contents="x")
+        fs.create_file("/work/keep.txt", contents="keep")
+        fs.create_file("/work/old/file.txt", contents="old")
+        monkeypatch.setattr("builtins.input", lambda x: "y")
+
+        command, flags, args = parse("rm -r /work/sub*/*.tmp /work/old")
+        stats = rm_many(args, flags)
+
+        assert stats.files == 21
+        assert stats.dirs == 1
+        assert not os.path.exists("/work/old")
+        assert sorted(os.listdir("/work")) == ["keep.txt", "sub0", "sub1", "sub2", "sub3"]
+        assert os.listdir("/work/sub0") == []
+
+    def test_remove_tree_on_disk(self, tmp_path):
+        """Тест remove_tree на реальном диске: глубокое и широкое дерево удаляется полностью"""
+        root = tmp_path / "tree"
+        for i in range(30):
+            deep = root / f"wide{i}" / "a" / "b"
+            deep.mkdir(parents=True)
+            (deep / "file.txt").write_text("x")
+        (root / "top.txt").write_text("x")
+        os.symlink(tmp_path, root / "link")
+        (tmp_path / "outside.txt").write_text("keep")
+
+        stats = remove_tree(root, jobs=4)
+
+        assert stats.files == 32
+        assert stats.dirs == 91
+        assert not root.exists()
+        assert (tmp_path / "outside.txt").read_text() == "keep"
+
+    def test_remove_tree_replaced_directory(self, tmp_path):
+        """Тест remove_tree: поддиректория, подмененная после обхода, не открывается"""
+        (tmp_path / "sub").mkdir()
+        expected = os.lstat(tmp_path / "sub")
+        os.rename(tmp_path / "sub", tmp_path / "moved")
+        (tmp_path / "sub").mkdir()
+        fd = os.open(tmp_path, _DIR_FLAGS)
+        try:
+            with pytest.raises(OSError, match="replaced"):
+                _open_directory("sub", fd, expected)
+            os.rmdir(tmp_path / "sub")
+            os.symlink(tmp_path / "moved", tmp_path / "sub")
+            with pytest.raises(OSError):
+                _open_directory("sub", fd, expected)
+        finally:
+            os.close(fd)
+
+    def test_du(self, fs):
+        """Тест du: суммы поддеревьев, глубина, top-N и однократный учет жестких ссылок"""
+        fs.create_file("/data/a.bin", contents="1" * 100)
+        fs.create_file("/data/sub/b.bin", contents="1" * 50)
+        fs.create_file("/data/sub/deep/c.bin", contents="1" * 10)
+        os.link("/data/a.bin", "/data/sub/a_link.bin")
+
+        rows = dict((path, size) for size, path in du("/data", apparent=True))
+        dir_size = {path: os.lstat(path).st_size for path in rows}
+        assert rows["/data/sub/deep"] == 10 + dir_size["/data/sub/deep"]
+        assert rows["/data/sub"] == 60 + dir_size["/data/sub"] + dir_size["/data/sub/deep"]
+        assert rows["/data"] == 160 + sum(dir_size.values())
+        assert du("/data", summarize=True, apparent=True) == [(rows["/data"], "/data")]
+        assert [path for _, path in du("/data", max_depth=1, apparent=True)] == ["/data", "/data/sub"]
+        assert [path for _, path in du("/data", limit=1, apparent=True)] == ["/data"]
+
+    def test_du_cache(self, fs):
+        """Тест du --cache: директории с прежним mtime не перечитываются"""
+        fs.create_dir(str(Path.home()))
+        fs.create_file("/data/sub/a.bin", contents="1" * 100)
+        for path in ("/data", "/data/sub"):
+            os.utime(path, (1, 1))
+
+        total = du("/data", summarize=True, apparent=True, cache=True)[0][0]
+        fs.create_file("/data/sub/b.bin", contents="1" * 50)
+        os.utime("/data/sub", (1, 1))
+        assert du("/data", summarize=True, apparent=True, cache=True)[0][0] == total
+
+        os.utime("/data/sub", (2, 2))
+        assert du("/data", summarize=True, apparent=True, cache=True)[0][0] == total + 50
+
+    def test_dedup(self, fs, monkeypatch):
+        """Тест dedup: отсев по размеру и частичному хэшу, замена дубликатов жесткими ссылками"""
+        big = b"x" * 10000
+        fs.create_file("/data/a.bin", contents=big)
+        fs.create_file("/data/sub/b.bin", contents=big)
+        fs.create_file("/data/c.bin", contents=b"x" * 5000 + b"y" + b"x" * 4999)
+        fs.create_file("/data/small1.txt", contents="same")
+        fs.create_file("/data/small2.txt", contents="same")
+        fs.create_file("/data/other.txt", contents="diff")
+        fs.create_file("/data/unique.txt", contents="unique")
+        monkeypatch.setattr("builtins.input", lambda x: "y")
+
+        groups, stats = dedup(["/data"], ["--link"])
+
+        assert sorted(groups) == [["/data/a.bin", "/data/sub/b.bin"], ["/data/small1.txt", "/data/small2.txt"]]
+        assert stats.files == 7
+        assert stats.partial_hashed == 6
+        assert stats.full_hashed == 3
+        assert stats.bytes == 10004
+        assert stats.reclaimed == 10004
+        assert os.stat("/data/a.bin").st_ino == os.stat("/data/sub/b.bin").st_ino
+        assert open("/data/sub/b.bin", "rb").read() == big
+
+        groups, stats = dedup(["/data"], [])
+        assert groups == []
+
+    def test_find(self, fs):
+        """Тест find с условиями по имени, размеру, типу и времени изменения"""
+        fs.create_file("/logs/app.log", contents="1" * 2048)
+        fs.create_file("/logs/old/app.log", contents="1" * 10)
+        fs.create_file("/logs/old/notes.txt", contents="text")
+        os.utime("/logs/old/app.log", (0, 0))
+
+        assert sorted(find("/logs", make_predicate(name="*.log"))) == ["/logs/app.log", "/logs/old/app.log"]
+        assert list(find("/logs", make_predicate(name="*.log", size="+1K"))) == ["/logs/app.log"]
+        assert list(find("/logs", make_predicate(mtime="+30"))) == ["/logs/old/app.log"]
+        assert list(find("/logs", make_predicate(kind="d"))) == ["/logs/old"]
+        with pytest.raises(InvalidInputError):
+            make_predicate(size="big")
+
+    def test_grep(self, tmp_path):
+        """Тест grep через mmap: подстрока, регулярное выражение, -l, -c и пропуск двоичных файлов"""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.log").write_bytes(b"ok\nERROR disk full\nok\nerror again")
+        (tmp_path / "sub" / "b.log").write_bytes(b"nothing here\n")
+        (tmp_path / "sub" / "c.bin").write_bytes(b"\0ERROR")
+        (tmp_path / "empty.log").write_bytes(b"")
+        a = str(tmp_path / "a.log")
+
+        assert list(grep("ERROR", [a], literal=True)) == [(a, b"ERROR disk full")]
+        assert list(grep("error", [a], ignore_case=True)) == [(a, b"ERROR disk full"), (a, b"error again")]
+        assert list(grep("^ok$", [a], count=True)) == [(a, 2)]
+        assert list(grep("full$", [a])) == [(a, b"ERROR disk full")]
+        assert list(grep("ERROR", [str(tmp_path)], recursive=True, files_only=True)) == [(a, None)]
+        errors = list(grep("ERROR", [str(tmp_path)]))
+        assert len(errors) == 1 and isinstance(errors[0], IsADirectoryError)
+
     def test_rm_does_not_exist(self):
         """тест удаления несуществующего файла"""
         with (pytest.raises(NotADirectoryError)):
@@ -260,6 +566,92 @@ class TestCommands:
         assert os.path.exists("/test_extract_dir/file1.txt")
         assert open("/test_extract_dir/file1.txt").read() == "content1"
 
+    def test_create_zip_parallel(self, fs):
+        """Тест параллельного создания zip архива"""
+        for i in range(20):
+            fs.create_file(f"/test_dir/sub{i % 4}/file{i}.txt", contents=f"content{i}" * 100)
+
+        create_zip("/test_dir", "/test_dir.zip", ["-j=4", "--level=9"])
+
+        with zipfile.ZipFile("/test_dir.zip") as zip:
+            assert zip.testzip() is None
+            assert len(zip.namelist()) == 20
+            assert zip.read("sub1/file5.txt") == b"content5" * 100
+            assert zip.getinfo("sub1/file5.txt").compress_type == zipfile.ZIP_DEFLATED
+
+    def test_zip_spool_memory(self, fs):
+        """Тест: буферы сжатых элементов в очереди записи zip укладываются в общий лимит памяти"""
+        for jobs in (1, 4, 32, 128):
+            assert 2 * jobs * spool_size(jobs) <= SPOOL_MEMORY_LIMIT
+            assert spool_size(jobs) <= SPOOL_MAX_SIZE
+        assert spool_size(32) < spool_size(1)
+
+    def test_extract_zip_parallel(self, fs):
+        """Тест распаковки zip архива в несколько потоков"""
+        for i in range(10):
+            fs.create_file(f"/test_dir/sub{i % 3}/file{i}.txt", contents=f"content{i}")
+        create_zip("/test_dir", "/test_dir.zip")
+
+        extract_zip("/test_dir.zip", "/extracted", ["-j=4"])
+
+        for i in range(10):
+            assert open(f"/extracted/sub{i % 3}/file{i}.txt").read() == f"content{i}"
+        assert not any(name.endswith(".part") for name in os.listdir("/extracted/sub0"))
+
+    def test_extract_zip_bad_crc(self, fs):
+        """Тест распаковки zip архива с поврежденным элементом"""
+        with zipfile.ZipFile("/bad.zip", "w") as zip:
+            zip.writestr("good.txt", "good content")
+            zip.writestr("dir/bad.txt", "bad content")
+        data = open("/bad.zip", "rb").read().replace(b"bad content", b"BAD content")
+        with open("/bad.zip", "wb") as file:
+            file.write(data)
+
+        with pytest.raises(ArchiveError):
+            extract_zip("/bad.zip", "/extracted")
+
+        assert not os.path.exists("/extracted")
+
+    def test_update_zip(self, fs, capsys):
+        """Тест обновления zip архива: сжимаются только новые и измененные файлы"""
+        for i in range(3):
+            fs.create_file(f"/test_dir/file{i}.txt", contents=f"content{i}" * 100)
+        create_zip("/test_dir", "/test_dir.zip")
+        with zipfile.ZipFile("/test_dir.zip") as zip:
+            kept = zip.getinfo("file1.txt")
+        with open("/test_dir/file0.txt", "a") as file:
+            file.write("changed")
+        os.remove("/test_dir/file2.txt")
+        fs.create_file("/test_dir/sub/new.txt", contents="new")
+
+        create_zip("/test_dir", "/test_dir.zip", ["-u"])
+
+        assert "2 files compressed, 1 reused" in capsys.readouterr().out
+        with zipfile.ZipFile("/test_dir.zip") as zip:
+            assert zip.testzip() is None
+            assert zip.namelist() == ["file0.txt", "file1.txt", "sub/new.txt"]
+            assert zip.read("file0.txt").endswith(b"changed")
+            assert (zip.getinfo("file1.txt").CRC, zip.getinfo("file1.txt").compress_size) == \
+                   (kept.CRC, kept.compress_size)
+        assert not os.path.exists("/test_dir.zip.part")
+
+    def test_update_zip_checksum(self, fs, capsys):
+        """Тест обновления zip архива со сравнением по CRC32: файл того же размера и времени изменения"""
+        fs.create_file("/test_dir/file.txt", contents="content1")
+        create_zip("/test_dir", "/test_dir.zip")
+        mtime = os.path.getmtime("/test_dir/file.txt")
+        with open("/test_dir/file.txt", "w") as file:
+            file.write("content2")
+        os.utime("/test_dir/file.txt", (mtime, mtime))
+
+        create_zip("/test_dir", "/test_dir.zip", ["-u"])
+        create_zip("/test_dir", "/test_dir.zip", ["-u", "--checksum"])
+
+        assert capsys.readouterr().out.splitlines() == ["0 files compressed, 1 reused",
+                                                        "1 files compressed, 0 reused"]
+        with zipfile.ZipFile("/test_dir.zip") as zip:
+            assert zip.read("file.txt") == b"content2"
+
     def test_create_zip_file_not_found(self, fs):
         """Тест создания zip из несуществующей директории"""
         with pytest.raises(FileNotFoundError):
@@ -295,6 +687,73 @@ class TestCommands:
         assert os.path.exists("/test_dir_extracted/file1.txt")
         assert open("/test_dir_extracted/file1.txt").read() == "content1"
 
+    @pytest.mark.parametrize("compression", ["gz", "bz2", "xz", "none"])
+    def test_create_tar_parallel(self, fs, compression):
+        """Тест создания tar архива с параллельным блочным сжатием"""
+        for i in range(10):
+            fs.create_file(f"/test_dir/sub{i % 3}/file{i}.txt", contents=os.urandom(3000))
+
+        create_tar("/test_dir", "/test_dir.tar", ["-j=4", f"--compress={compression}"])
+
+        with tarfile.open("/test_dir.tar", "r:*") as tar:
+            assert len(tar.getnames()) == 10
+        extract_tar("/test_dir.tar", "/extracted")
+        assert open("/extracted/sub1/file4.txt", "rb").read() == open("/test_dir/sub1/file4.txt", "rb").read()
+
+    def test_incremental_tar(self, fs):
+        """Тест инкрементального tar архива по файлу снимка и восстановления цепочки архивов"""
+        for name in ("file1.txt", "file2.txt", "sub/file3.txt"):
+            fs.create_file(f"/test_dir/{name}", contents=name)
+            os.utime(f"/test_dir/{name}", (1000, 1000))
+        create_tar("/test_dir", "/full.tar.gz", ["--incremental=/snapshot.json"])
+        with open("/test_dir/file1.txt", "w") as file:
+            file.write("changed")
+        os.utime("/test_dir/file1.txt", (2000, 2000))
+        os.remove("/test_dir/sub/file3.txt")
+        fs.create_file("/test_dir/new.txt", contents="new")
+
+        create_tar("/test_dir", "/inc1.tar.gz", ["--incremental=/snapshot.json"])
+
+        with tarfile.open("/inc1.tar.gz") as tar:
+            assert tar.getnames() == [TAR_INCREMENTAL_MEMBER, "file1.txt", "new.txt"]
+        for archive in ("/full.tar.gz", "/inc1.tar.gz"):
+            extract_tar(archive, "/restored")
+        assert sorted(os.listdir("/restored")) == ["file1.txt", "file2.txt", "new.txt"]
+        assert open("/restored/file1.txt").read() == "changed"
+
+    def test_incremental_member_name_reserved(self, fs):
+        """Тест: файл с именем списка удаленных - обычный элемент, а tar отказывается его архивировать"""
+        fs.create_file("/victim.txt", contents="keep")
+        fs.create_file(f"/plain/{TAR_INCREMENTAL_MEMBER}", contents='{"deleted": ["victim.txt"]}')
+        with tarfile.open("/plain.tar", "w") as tar:
+            tar.add(f"/plain/{TAR_INCREMENTAL_MEMBER}", TAR_INCREMENTAL_MEMBER)
+
+        extract_tar("/plain.tar", "/")
+
+        assert open("/victim.txt").read() == "keep"
+        assert os.path.exists(f"/{TAR_INCREMENTAL_MEMBER}")
+        with pytest.raises(ArchiveError):
+            create_tar("/plain", "/plain2.tar.gz", ["--incremental=/snapshot.json"])
+        assert not os.path.exists("/snapshot.json")
+
+    def test_extract_tar_invalid(self, fs):
+        """Тест извлечения файла, который не является tar архивом"""
+        fs.create_file("/not_tar.tar", contents="not a tar archive")
+
+        with pytest.raises(InvalidArchiveError):
+            extract_tar("/not_tar.tar", "/extracted")
+
+    def test_extract_tar_stdin(self, fs, monkeypatch):
+        """Тест потокового извлечения tar архива из стандартного ввода"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        create_tar("/test_dir", "/test_dir.tar.gz")
+        with open("/test_dir.tar.gz", "rb") as file:
+            monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BufferedReader(io.BytesIO(file.read()))))
+
+        extract_tar("-", "/extracted")
+
+        assert open("/extracted/file1.txt").read() == "content1"
+
     def test_zip_does_not_exist(self, fs):
         """Тест создания и извлечения zip архива из несуществующей директории"""
         with pytest.raises(FileNotFoundError):
@@ -307,12 +766,374 @@ class TestCommands:
             create_tar("/nonexistent_directory", "test.tar")
             extract_tar("/nonexistent_directory.tar", "test")
 
+    def test_extract_zip_members(self, fs):
+        """Тест извлечения выбранных элементов zip архива"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        fs.create_file("/test_dir/sub/file2.txt", contents="content2")
+        fs.create_file("/test_dir/sub/file3.log", contents="content3")
+        create_zip("/test_dir", "/test_dir.zip")
+
+        extract_zip("/test_dir.zip", "/extracted", members=["sub"], flags=["--exclude=*.log"])
+
+        assert sorted(os.listdir("/extracted")) == ["sub"]
+        assert os.listdir("/extracted/sub") == ["file2.txt"]
+        with pytest.raises(FileNotFoundError):
+            extract_zip("/test_dir.zip", "/extracted", members=["missing.txt"])
+
+    def test_unzip_destination_flag(self, fs):
+        """Тест unzip через parse и dispatch: путь извлечения только через -d, опечатка в имени - ошибка"""
+        from src.parser import parse
+        from src.registry import dispatch
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        fs.create_file("/test_dir/file2.txt", contents="content2")
+        create_zip("/test_dir", "/test_dir.zip")
+
+        assert not dispatch(*parse("unzip /test_dir.zip fiel1.txt -d /out"))
+        assert not os.path.exists("/out")
+        assert not os.path.exists("/fiel1.txt")
+
+        assert dispatch(*parse("unzip /test_dir.zip file1.txt -d /out"))
+        assert os.listdir("/out") == ["file1.txt"]
+
+    def test_extract_tar_include_exclude(self, fs):
+        """Тест извлечения элементов tar архива по шаблонам --include/--exclude"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        fs.create_file("/test_dir/sub/file2.txt", contents="content2")
+        fs.create_file("/test_dir/sub/file3.log", contents="content3")
+        create_tar("/test_dir", "/test_dir.tar.gz")
+
+        extract_tar("/test_dir.tar.gz", "/extracted", ["--include=*.txt", "--exclude=sub"])
+
+        assert os.listdir("/extracted") == ["file1.txt"]
+
+    def test_member_selection_stops_after_literal_names(self):
+        """Тест выбора элементов: директория выбирает содержимое, точные имена завершают поиск"""
+        select = MemberSelection(["sub/file2.txt", "dir"], ["*.log"])
+
+        assert select("dir/a.txt")
+        assert not select("dir/a.log")
+        assert not select("file1.txt")
+        assert select("sub/file2.txt")
+        assert not select.complete
+        single = MemberSelection(["./a.txt"])
+        assert single("a.txt")
+        assert single.complete
+
+    @pytest.mark.parametrize("archive", ["/test_dir.zip", "/test_dir.tar.gz"])
+    def test_print_members(self, fs, archive):
+        """Тест вывода элемента архива в поток без записи на диск"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        fs.create_file("/test_dir/sub/file2.txt", contents="content2")
+        (create_zip if archive.endswith(".zip") else create_tar)("/test_dir", archive)
+        out = io.BytesIO()
+
+        try:
+            assert print_members(archive, ["sub/file2.txt"], out=out) == 8
+            assert out.getvalue() == b"content2"
+            with pytest.raises(FileNotFoundError):
+                print_members(archive, ["missing.txt"], out=io.BytesIO())
+        finally:
+            vfs.clear_cache()
+
+    @pytest.mark.parametrize("archive", ["/test_dir.zip", "/test_dir.tar.gz"])
+    def test_archive_browse(self, fs, archive):
+        """Тест просмотра архива как директории: ls, cat и cd без распаковки"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        fs.create_file("/test_dir/sub/file2.txt", contents="content2")
+        (create_zip if archive.endswith(".zip") else create_tar)("/test_dir", archive)
+
+        assert sorted(ls(archive)) == ["file1.txt", "sub"]
+        row = ls_l(f"{archive}/sub")[0].split()
+        assert (row[1], row[-1]) == ("8", "file2.txt")
+        assert cat(f"{archive}/file1.txt") == "content1"
+        out = io.BytesIO()
+        assert cat_stream(f"{archive}/sub/file2.txt", out) == 8
+        assert out.getvalue() == b"content2"
+
+        try:
+            assert cd(f"{archive}/sub") == os.path.join(archive, "sub")
+            assert vfs.getcwd() == os.path.join(archive, "sub")
+            assert ls(".") == ["file2.txt"]
+            assert cat("file2.txt") == "content2"
+            cd("..")
+            assert sorted(ls(".")) == ["file1.txt", "sub"]
+            with pytest.raises(NotADirectoryError):
+                cd("file1.txt")
+            with pytest.raises(FileNotFoundError):
+                cat("missing.txt")
+            cd("/test_dir")
+            assert not vfs.in_archive()
+            assert os.getcwd() == "/test_dir"
+        finally:
+            vfs.chdir(None)
+            vfs.clear_cache()
+
+    def test_archive_cwd_blocks_relative_file_commands(self, fs):
+        """Тест: внутри архива cp, mv и rm не принимают относительные пути и пути внутрь архива"""
+        from src.file_commands import run_cp, run_rm
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        create_zip("/test_dir", "/test_dir.zip")
+        fs.create_file("/file1.txt", contents="real")
+
+        try:
+            cd("/test_dir.zip")
+            with pytest.raises(InvalidInputError):
+                run_rm([], ["file1.txt"])
+            with pytest.raises(InvalidInputError):
+                run_cp([], ["/file1.txt", "copy.txt"])
+            with pytest.raises(InvalidInputError):
+                run_rm([], ["/test_dir.zip/file1.txt"])
+            assert open("/file1.txt").read() == "real"
+            run_cp([], ["/file1.txt", "/copy.txt"])
+            assert open("/copy.txt").read() == "real"
+        finally:
+            vfs.chdir(None)
+            vfs.clear_cache()
+
+    def test_tar_index_magic_across_reads(self, fs, monkeypatch):
+        """Тест: сигнатура следующего gzip потока разрезана границей чтения"""
+        monkeypatch.setattr(vfs.TarIndex, "_load", lambda self: False)
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        create_tar("/test_dir", "/test_dir.tar", ["--compress=none"])
+        data = open("/test_dir.tar", "rb").read()
+        half = len(data) // 1024 * 512
+        with open("/multi.tar.gz", "wb") as file:
+            file.write(gzip.compress(data[:half]) + gzip.compress(data[half:]))
+        first = gzip.compress(data[:half])
+
+        for chunk_size in (len(first) + 1, len(first) - 1, 3):
+            monkeypatch.setattr(vfs, "CHUNK_SIZE", chunk_size)
+            vfs.clear_cache()
+            index = vfs.TarIndex("/multi.tar.gz")
+            with index.open("file1.txt") as file:
+                assert file.read() == b"content1"
+            assert len(index.checkpoints) == 2
+
+    def test_tar_index_bad_cache(self, fs):
+        """Тест: кэш индекса с неверной структурой отбрасывается, индекс строится заново"""
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        create_tar("/test_dir", "/test_dir.tar.gz")
+        cache = vfs.TarIndex("/test_dir.tar.gz")._cache_path()
+        cache.write_text('{"members": [[1]], "checkpoints": 5}', encoding="utf-8")
+
+        index = vfs.TarIndex("/test_dir.tar.gz")
+
+        with index.open("file1.txt") as file:
+            assert file.read() == b"content1"
+
+    def test_tar_index_checkpoints(self, fs):
+        """Тест чтения элемента сжатого tar с ближайшей точки восстановления и кэша индекса на диске"""
+        contents = {f"file{i}.bin": os.urandom(3 * 1024 * 1024) for i in range(4)}
+        for name, data in contents.items():
+            fs.create_file(f"/test_dir/{name}", contents=data)
+        create_tar("/test_dir", "/test_dir.tar", ["-j=4", "--compress=gz"])
+
+        index = vfs.TarIndex("/test_dir.tar")
+        assert len(index.checkpoints) > 1
+        entry = index.entry("file3.bin")
+        assert index._range(entry.offset, 10).__next__() == contents["file3.bin"][:10]
+        with index.open("file3.bin") as file:
+            assert file.read() == contents["file3.bin"]
+
+        cached = vfs.TarIndex("/test_dir.tar")
+        assert [point[:2] for point in cached.checkpoints] == [point[:2] for point in index.checkpoints]
+        with cached.open("file1.bin") as file:
+            assert file.read() == contents["file1.bin"]
+
 class Test_Const:
     def test_const_commands(self):
         from src.const import COMMANDS
-        expected = ("ls", "pwd", "cd", "cat", "cp", "mv", "rm", "zip", "unzip", "tar", "untar")
+        expected = ("ls", "pwd", "cd", "cat", "cp", "mv", "rm", "zip", "unzip", "tar", "untar", "du",
+                    "dedup", "find", "grep", "stats", "jobs", "wait", "kill")
         assert COMMANDS == expected
 
+class Test_Registry:
+    def test_dispatch_registered_command(self):
+        from src.registry import dispatch, register_command, COMMAND_REGISTRY
+        calls = []
+        register_command("hello", lambda flags, args: calls.append((flags, args)), min_args=1)
+        try:
+            assert dispatch("hello", ["-x"], ["world"])
+            assert not dispatch("hello", [], [])
+            assert calls == [(["-x"], ["world"])]
+        finally:
+            del COMMAND_REGISTRY["hello"]
+
+    def test_dispatch_unknown_command(self, capsys):
+        from src.registry import dispatch
+        assert not dispatch("unknown_command", [], [])
+        assert "Invalid command: unknown_command" in capsys.readouterr().out
+
+    def test_lazy_handler(self):
+        from src.registry import find_command
+        from src.archive_commands import run_zip
+        assert find_command("zip").handler is run_zip
+
+class Test_Stats:
+    def test_stats_records_commands(self, capsys):
+        from src.registry import dispatch, register_command, COMMAND_REGISTRY
+        from src.stats import enable_stats, disable_stats, phase, reset_stats, summary
+
+        def slow(flags, args):
+            with phase("work"):
+                sum(range(10000))
+
+        register_command("slow", slow)
+        try:
+            enable_stats()
+            for _ in range(5):
+                assert dispatch("slow", [], [])
+            disable_stats()
+            assert dispatch("slow", [], [])
+            data = summary("slow")
+            assert data["count"] == 5
+            assert data["failed"] == 0
+            assert data["p50"] <= data["p90"] <= data["p99"]
+            assert data["phases"]["work"] > 0
+            assert dispatch("stats", [], ["slow"])
+            assert "slow" in capsys.readouterr().out
+        finally:
+            disable_stats()
+            reset_stats()
+            del COMMAND_REGISTRY["slow"]
+
+    def test_profile_flag(self, tmp_path, monkeypatch):
+        from src.registry import dispatch, register_command, COMMAND_REGISTRY
+        calls = []
+        register_command("hello", lambda flags, args: calls.append(flags))
+        monkeypatch.chdir(tmp_path)
+        try:
+            assert dispatch("hello", ["-x", "--profile"], [])
+        finally:
+            del COMMAND_REGISTRY["hello"]
+        assert calls == [["-x"]]
+        assert len(list(tmp_path.glob("hello-*.pstats"))) == 1
+
+class Test_Script:
+    def test_run_script(self, fs, capsys):
+        from src.script import run_script
+        fs.create_file("/file1.txt", contents="content1")
+
+        code = run_script(["# comment", "cp /file1.txt /file2.txt", "", "cat /file2.txt"])
+
+        assert code == 0
+        assert "content1" in capsys.readouterr().out
+        assert os.path.exists("/file2.txt")
+
+    def test_run_script_stops_on_error(self, fs):
+        from src.script import run_script
+        fs.create_file("/file1.txt", contents="content1")
+
+        code = run_script(["cat /nonexistent", "cp /file1.txt /file2.txt"])
+
+        assert code == 1
+        assert not os.path.exists("/file2.txt")
+
+    def test_run_script_report(self, fs, capsys):
+        from src.script import run_script
+        fs.create_file("/file1.txt", contents="content1")
+
+        code = run_script(["cp /file1.txt /file2.txt", "bad_command", "ls /"], report=True, keep_going=True)
+
+        err = capsys.readouterr().err
+        assert code == 1
+        assert "FAIL" in err and "bad_command" in err
+        assert os.path.exists("/file2.txt")
+
+    def test_run_script_no_prompts(self, fs, monkeypatch):
+        """Тест: в сценарии команда с подтверждением завершается ошибкой и не читает ввод"""
+        from src.script import run_script
+        fs.create_file("/test_dir/file1.txt")
+        monkeypatch.setattr("builtins.input", lambda prompt="": pytest.fail("input() called in script mode"))
+
+        code = run_script(["rm -r /test_dir", "y"], keep_going=True)
+
+        assert code == 1
+        assert os.path.exists("/test_dir/file1.txt")
+        assert run_script(["rm -r -f /test_dir"]) == 0
+        assert not os.path.exists("/test_dir")
+
+class Test_Jobs:
+    def test_background_jobs(self, tmp_path):
+        from src.jobs import submit_job, wait_jobs, kill_job, _jobs
+        from src.registry import register_command, COMMAND_REGISTRY
+        release = threading.Event()
+        order = []
+
+        def blocking(flags, args):
+            release.wait(5)
+            order.append(args[0])
+
+        register_command("block", blocking, min_args=1, path_args=slice(None))
+        try:
+            shared = str(tmp_path / "shared")
+            submit_job("block shared", "block", [], [shared])
+            submit_job("block shared/sub", "block", [], [shared + "/sub"])
+            submit_job("block other", "block", [], [str(tmp_path / "other")])
+            submit_job("block shared 2", "block", [], [shared])
+            first, second, other, third = list(_jobs.values())[-4:]
+
+            assert first.status == "running"
+            assert second.status == "queued"
+            assert other.status == "running"
+            kill_job(third.id)
+            release.set()
+
+            assert wait_jobs()
+            assert (first.status, second.status, other.status, third.status) == ("done", "done", "done", "killed")
+            assert order.index(shared) < order.index(shared + "/sub")
+        finally:
+            del COMMAND_REGISTRY["block"]
+
+    def test_background_paths(self, tmp_path, monkeypatch, capsys):
+        """Тест: в фоне абсолютными становятся только пути, шаблон grep и элементы unzip не меняются"""
+        from src.jobs import _jobs, wait_jobs
+        from src.script import run_line
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "notes.txt").write_text("first\nneedle here\n")
+        with zipfile.ZipFile(tmp_path / "arc.zip", "w") as archive:
+            archive.writestr("a.txt", "a")
+            archive.writestr("b.txt", "b")
+
+        assert run_line("grep needle notes.txt &")
+        assert run_line("unzip arc.zip a.txt -d out &")
+        assert run_line("du &")
+        grep_job, unzip_job, du_job = list(_jobs.values())[-3:]
+        assert wait_jobs()
+
+        assert grep_job.args == ["needle", str(tmp_path / "notes.txt")]
+        assert unzip_job.args == [str(tmp_path / "arc.zip"), "a.txt"]
+        assert f"-d={tmp_path / 'out'}" in unzip_job.flags
+        assert unzip_job.paths == {tmp_path / "arc.zip", tmp_path / "out"}
+        assert du_job.paths == {tmp_path}
+        assert "needle here" in capsys.readouterr().out
+        assert os.listdir(tmp_path / "out") == ["a.txt"]
+
+    def test_background_prompting_command(self, tmp_path, capsys):
+        """Тест: команды с подтверждением не запускаются в фоне без -f, в потоке задачи запрос запрещен"""
+        from src.jobs import submit_job, wait_jobs
+        from src.parser import confirm
+        target = tmp_path / "dir"
+        target.mkdir()
+
+        assert not submit_job("rm -r dir", "rm", ["-r"], [str(target)])
+        assert "use -f" in capsys.readouterr().out
+        errors = []
+
+        def ask():
+            try:
+                confirm("Continue?")
+            except InvalidInputError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=ask)
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+        assert submit_job("rm -r -f dir", "rm", ["-r", "-f"], [str(target)])
+        assert wait_jobs()
+        assert not target.exists()
+
 class Test_Parse:
     def test_parse_basic_command(self):
         from src.parser import parse
@@ -328,6 +1149,36 @@ class Test_Parse:
         assert flags == ["-r"]
         assert args == ["qeweqwqew"]
 
+    def test_parse_value_flags_per_command(self):
+        from src.parser import parse
+        assert parse("find . --name *.py") == ("find", ["--name=*.py"], ["."])
+        assert parse("ls -l --top 5 /") == ("ls", ["-l", "--top=5"], ["/"])
+        with pytest.raises(InvalidInputError):
+            parse("rm --name file")
+
+    def test_parse_glob(self, fs):
+        from src.parser import parse
+        fs.create_file("/dir/b.tmp")
+        fs.create_file("/dir/a.tmp")
+        fs.create_file("/dir/c.txt")
+        command, flags, args = parse("rm /dir/*.tmp '/dir/*.txt' /dir/*.none")
+        assert args == ["/dir/a.tmp", "/dir/b.tmp", "/dir/*.txt", "/dir/*.none"]
+
+    def test_parse_stdin_dash(self, fs, monkeypatch):
+        """Тест: одиночный '-' - аргумент (stdin), а не флаг; untar - каталог через parse и dispatch"""
+        from src.parser import parse
+        from src.registry import dispatch
+        fs.create_file("/test_dir/file1.txt", contents="content1")
+        create_tar("/test_dir", "/test_dir.tar.gz")
+        with open("/test_dir.tar.gz", "rb") as file:
+            monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BufferedReader(io.BytesIO(file.read()))))
+
+        command, flags, args = parse("untar - /extracted")
+
+        assert (flags, args) == ([], ["-", "/extracted"])
+        assert dispatch(command, flags, args)
+        assert open("/extracted/file1.txt").read() == "content1"
+
 class Test_logging:
     def test_logging(self):
         setup_logging()
@@ -336,6 +1187,48 @@ class Test_logging:
         log_success("test2")
         log_success("test3")
 
+    def test_file_events_summary(self, caplog):
+        """Тест сворачивания файловых событий в сводку"""
+        flush_file_events()
+        caplog.set_level(logging.INFO)
+        log_file_event("Added", "file1.txt")
+        log_file_event("Added", "file2.txt")
+
+        flush_file_events()
+
+        assert "Added 2 files" in caplog.text
+        assert "file1.txt" not in caplog.text
+
+    def test_main_verbose(self, tmp_path, caplog, monkeypatch):
+        """Тест: с --verbose каждое файловое событие записывается в журнал"""
+        from src.main import main
+        monkeypatch.setattr("src.logger._verbose", False)
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "file1.txt").write_text("content1")
+        (tmp_path / "script.txt").write_text("ls\n")
+        caplog.set_level(logging.INFO)
+
+        assert main(["--verbose", "script.txt"]) == 0
+
+        assert "Listed file1.txt" in caplog.text
+
+    def test_background_logging(self, tmp_path):
+        """Тест фоновой записи журнала без потери сообщений"""
+        log_queue = queue.SimpleQueue()
+        handler = BatchingFileHandler(tmp_path / "test.log", batch_size=1000, encoding="utf-8")
+        listener = BatchingQueueListener(log_queue, handler, interval=0.01)
+        logger = logging.getLogger("test_background_logging")
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener.start()
+
+        for i in range(100):
+            logger.warning(f"message{i}")
+        listener.stop()
+        handler.close()
+
+        assert (tmp_path / "test.log").read_text(encoding="utf-8").splitlines() == [f"message{i}" for i in range(100)]
+
 
 
 